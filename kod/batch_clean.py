@@ -0,0 +1,156 @@
+import os
+import json
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import general_functions as gf
+from get_data import Game
+from event_log import EventLog
+from game_registry import GameRegistry
+
+
+class BatchCleaner:
+    '''cleans every raw csv in data/<season>/raw into data/<season>/clean in one go, without chdir or questions
+        only files whose clean csv is missing, whose raw csv changed or that were cleaned with another vocabulary are cleaned,
+        they are spread over a process pool. what the token table can't answer ends up in one queue of ambiguity files
+        that can be answered at the end, answers from earlier cleans are reused so the same question is never asked twice.
+        many old clean csvs were fixed by hand afterwards, those are never cleaned again unless forced'''
+
+    # class variables
+    # raw path (relative to data) -> {'raw': sha1 of the raw csv, 'vocabulary': Game.vocabulary_hash()} of the last clean
+    stamp_file = os.path.join(gf.cache_folder, 'clean stamps.json')
+
+    # constructor
+    def __init__(self, data_folder = GameRegistry.data_folder, teams = None, workers = None) -> None:
+        '''teams is used for every file if given, otherwise each file gets the teams of its earlier clean or a guess
+            workers is the size of the process pool, None uses every core'''
+        self.data_folder = data_folder
+        self.teams = teams
+        self.workers = workers
+        self.vocabulary = Game.vocabulary_hash()
+        self.stamps = BatchCleaner.read_stamps()
+        return
+
+# static methods
+    def clean_name(filename_in: str) -> str:
+        '''returns where the clean csv of data/<season>/raw/x.csv goes, data/<season>/clean/x clean.csv'''
+        season = os.path.dirname(os.path.dirname(filename_in))
+        return os.path.join(season, 'clean', gf.append_clean(os.path.basename(filename_in), change_dirr = False))
+
+    def read_stamps() -> dict:
+        '''returns the stamps of earlier runs, an empty dict if there are none'''
+        if not os.path.isfile(BatchCleaner.stamp_file):
+            return dict()
+        with open(BatchCleaner.stamp_file, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def write_stamps(stamps: dict) -> None:
+        '''saves the stamps, through a temporary file like everything else we write'''
+        os.makedirs(gf.cache_folder, exist_ok=True)
+        with open(BatchCleaner.stamp_file + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(stamps, f, ensure_ascii=False, indent=0, sort_keys=True)
+        os.replace(BatchCleaner.stamp_file + '.tmp', BatchCleaner.stamp_file)
+        return
+
+    def teams_of(filename_in: str, filename_out: str) -> set:
+        '''returns the teams used in the earlier clean of filename_in, filled up with guesses from the raw file
+            old cleans were answered by hand, so they know spellings the guess doesn't'''
+        try:
+            teams = set(Game.as_text(gf.read_csv_as_df(filename_out)['team']).dropna()) - {'0'}
+        except Exception:
+            teams = set()
+        if len(teams) < 2:
+            teams |= set(sorted(Game.guess_teams(EventLog.read_df(filename_in)) - teams)[:2 - len(teams)])
+        return teams
+
+    def raw_stamp(filename_in: str) -> str:
+        '''returns what tells us that the raw csv has changed, the sha1 of its content
+            mtimes are no use for that, a touch, a copy or a git checkout gives the file a new one without changing it'''
+        return gf.file_hash(filename_in)
+
+    def clean_file(filename_in: str, filename_out: str, teams = None, keep_edited = False) -> dict:
+        '''the work done in the pool for one file, cleans it in batch mode and returns what happened
+            a static method so that it can be sent to another process'''
+        result = {'raw': filename_in, 'clean': filename_out, 'teams': None, 'unresolved': 0, 'kept': False, 'error': None}
+        try:
+            result['teams'] = sorted(BatchCleaner.teams_of(filename_in, filename_out) if teams is None else teams)
+            unresolved = Game(set(result['teams'])).clean_csv(filename_in, batch = True, filename_out = filename_out, keep_edited = keep_edited)
+            result['kept'] = unresolved is None
+            result['unresolved'] = 0 if unresolved is None else unresolved
+        except Exception as e:
+            result['error'] = f'{type(e).__name__}: {e}'
+        return result
+
+# non-static methods
+    def raw_files(self) -> list:
+        '''returns (raw, clean) for every csv in data/<season>/raw'''
+        files = list()
+        for season in sorted(os.listdir(self.data_folder)):
+            raw = os.path.join(self.data_folder, season, 'raw')
+            if os.path.isdir(raw):
+                files += [(os.path.join(raw, x), BatchCleaner.clean_name(os.path.join(raw, x))) for x in sorted(os.listdir(raw)) if x.endswith('.csv')]
+        return files
+
+    def stamp_key(self, filename_in: str) -> str:
+        '''returns the key of filename_in in the stamps, the path relative to the data folder with /'''
+        return os.path.relpath(filename_in, self.data_folder).replace(os.sep, '/')
+
+    def stale(self, force = False) -> list:
+        '''returns (raw, clean, keep_edited) for the files that need cleaning, keep_edited unless force
+            a clean csv that no longer lines up with its raw csv (fixed by hand) is then kept, also when the raw csv has changed.
+            a clean csv we have not made ourselves is taken to be up to date with its raw csv and the current vocabulary'''
+        files = list()
+        for filename_in, filename_out in self.raw_files():
+            raw = BatchCleaner.raw_stamp(filename_in)
+            stamp = self.stamps.setdefault(self.stamp_key(filename_in), {'raw': raw, 'vocabulary': self.vocabulary})
+            if force or not os.path.isfile(filename_out) or stamp['raw'] != raw or stamp['vocabulary'] != self.vocabulary:
+                files.append((filename_in, filename_out, not force))
+        return files
+
+    def run(self, force = False) -> list:
+        '''cleans the stale files in a process pool and returns the results of the ones that left questions, the queue for ask'''
+        start = time.time()
+        files = self.stale(force)
+        print(f'{len(files)} of {len(self.raw_files())} raw files need cleaning')
+        results = list()
+        if len(files) == 1 or self.workers == 1:
+            results = [BatchCleaner.clean_file(filename_in, filename_out, self.teams, keep_edited) for filename_in, filename_out, keep_edited in files]
+        elif len(files) > 1:
+            with ProcessPoolExecutor(max_workers=self.workers) as pool:
+                futures = [pool.submit(BatchCleaner.clean_file, filename_in, filename_out, self.teams, keep_edited) for filename_in, filename_out, keep_edited in files]
+                results = [future.result() for future in as_completed(futures)]
+        for result in sorted(results, key=lambda result: result['raw']):
+            name = os.path.basename(result['raw'])
+            if result['error'] is not None:
+                print(f'unable to clean {name}: {result["error"]}')
+                continue
+            self.stamps[self.stamp_key(result['raw'])] = {'raw': BatchCleaner.raw_stamp(result['raw']), 'vocabulary': self.vocabulary}
+            if result['kept']:
+                print(f'{name}: kept the clean csv, it has been edited by hand (use --force to clean it anyway)')
+            elif result['unresolved'] > 0:
+                print(f'{name}: {result["unresolved"]} unresolved entries, teams {" ".join(result["teams"])}')
+        BatchCleaner.write_stamps(self.stamps)
+        queue = [result for result in sorted(results, key=lambda result: result['raw']) if result['error'] is None and result['unresolved'] > 0]
+        print(f'cleaned {len([result for result in results if not result["kept"]])} files in {time.time() - start:.1f} s, {sum(result["unresolved"] for result in queue)} questions in {len(queue)} files')
+        return queue
+
+    def ask(self, queue: list) -> None:
+        '''asks the questions of every file in the queue from run, one file at a time'''
+        for result in queue:
+            print(os.path.basename(result['raw']))
+            Game(set(result['teams'])).resolve_ambiguities(result['raw'], filename_out = result['clean'])
+        return
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description='cleans the raw csvs in data/<season>/raw that have no up to date clean csv')
+    parser.add_argument('--force', action='store_true', help='clean every raw file, not only the stale ones')
+    parser.add_argument('--workers', type=int, default=None, help='number of processes, every core by default')
+    parser.add_argument('--teams', nargs='+', default=None, help='the team abbreviations of every file, otherwise taken from the earlier clean or guessed')
+    parser.add_argument('--ask', action='store_true', help='answer the questions that are left when all files are cleaned')
+    args = parser.parse_args()
+
+    cleaner = BatchCleaner(teams = set(args.teams) if args.teams is not None else None, workers = args.workers)
+    queue = cleaner.run(force = args.force)
+    if args.ask:
+        cleaner.ask(queue)
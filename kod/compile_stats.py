@@ -1,22 +1,101 @@
 import os
 import general_functions as gf
 from get_stats import Stats
+from stats_accumulator import StatsAccumulator
+from concurrent.futures import ProcessPoolExecutor, as_completed
 import numpy as np
 from get_data import Game
+from game_registry import GameRegistry
+from event_warehouse import EventWarehouse
+from event_archive import EventArchive
 import pandas as pd
 
 class CompileStats:
-    def __init__(self, path_to_games: str, main_team = 'iks', N = 1000) -> None:
+    def __init__(self, path_to_games = None, main_team = 'iks', N = 1000, sql = None, archive = None, workers = None, progress = None, **query) -> None:
+        '''compiles the games in the folder path_to_games, or if query is given the games in the registry that match it
+            e.g. CompileStats(tag = 'inomhus') or CompileStats(opponent = 'villa', start = '2023-01-01'), see GameRegistry.find.
+            sql is (query, params) for the event warehouse, use CompileStats.from_sql.
+            archive is a (first, last) game_id range in the event archive, use CompileStats.from_archive.
+            workers and progress are for loading the games, see fill_games'''
         self.path = path_to_games
+        self.query = query
+        self.sql = sql
+        self.archive = archive
         self.main_team = main_team
         self.teams = {self.main_team, 'opponent'}
-        self.fill_games(N)
+        self.fill_games(N, workers, progress)
         self.big_df = self.fill_df()
         self.all_stats = dict()
         self.stats_summary = dict()
         self.compile_all_stats()
         self.summarize_stats()
 
+    def from_sql(query: str, params = (), main_team = 'iks', N = 1000, progress = None):
+        '''returns a CompileStats of the games in the event warehouse that match query, a WHERE clause on the games table g
+            e.g. CompileStats.from_sql(*EventWarehouse.where(opponent = 'edsbyn', tag = 'utomhus', start = '2022-01-01'))'''
+        return CompileStats(main_team = main_team, N = N, sql = (query, params), progress = progress)
+
+    def from_archive(first_game_id: int, last_game_id: int, main_team = 'iks', N = 1000, progress = None):
+        '''returns a CompileStats of the games first_game_id to last_game_id (included) in the event archive
+            the game_ids are the same as in the event warehouse'''
+        return CompileStats(main_team = main_team, N = N, archive = (first_game_id, last_game_id), progress = progress)
+
+    def print_progress(done: int, total: int, path: str) -> None:
+        '''a progress for fill_games that prints each game when it has been loaded, e.g. CompileStats(path, progress = CompileStats.print_progress)'''
+        print(f'{done}/{total} {path}')
+        return
+
+    def load_game(filename: str, main_team = 'iks') -> tuple:
+        '''returns (frame parts, zones flipped, accumulator, cache stats) of the half in filename with every section computed, what a process of load_games sends back
+            numbers and short lists (see Game.frame_parts and StatsAccumulator) instead of a pickled Stats object with its data frames.
+            the cache stats are what reading the csv added to gf.cache_stats in the process, the parent adds them to its own.
+            None if the half can't be compiled, then it is loaded without the pool so that the error shows where it is read'''
+        before = dict(gf.cache_stats)
+        try:
+            stats = Stats(filename, main_team = main_team)
+            accumulator = StatsAccumulator(stats)
+        except Exception:
+            return None
+        return Game.frame_parts(stats.big_df), stats.zones_flipped, accumulator, gf.cache_stats_since(before)
+
+    def game_from_parts(filename: str, parts: tuple, main_team = 'iks') -> Stats:
+        '''returns the Stats object of the parts made by load_game, the events are not read or turned again and no section is computed again'''
+        frame, zones_flipped, accumulator = parts[:3]
+        stats = Stats(filename, main_team = main_team, big_df = Game.frame_from_parts(frame), zones_flipped = zones_flipped)
+        return accumulator.fill(stats)
+
+    def load_games(filenames: list, main_team = 'iks', workers = None, progress = None) -> list:
+        '''returns the Stats object of every file in filenames, in the same order, made at most once per process for each csv content (see GameRegistry.load)
+            the halves not loaded yet are loaded here one by one, or compiled in a process pool with workers processes if workers is more than 1.
+            the result is in the order of filenames whichever process finishes first, and the same for any number of workers.
+            progress(done, total, path) is called as each half not loaded yet is done'''
+        keys = [(gf.file_hash(filename), main_team) for filename in filenames]
+        # the first file of each csv content that has not been loaded
+        missing = dict()
+        for key, filename in zip(keys, filenames):
+            if key not in GameRegistry.loaded and key not in missing:
+                missing[key] = filename
+        workers = min(len(missing), workers or 1)
+        if workers <= 1:
+            for done, filename in enumerate(missing.values()):
+                GameRegistry.load(filename, main_team = main_team)
+                if progress is not None:
+                    progress(done + 1, len(missing), filename)
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                futures = {pool.submit(CompileStats.load_game, filename, main_team): key for key, filename in missing.items()}
+                for done, future in enumerate(as_completed(futures)):
+                    key = futures[future]
+                    parts = future.result()
+                    if parts is None:
+                        GameRegistry.loaded[key] = Stats(missing[key], main_team = main_team)
+                    else:
+                        GameRegistry.loaded[key] = CompileStats.game_from_parts(missing[key], parts, main_team)
+                        gf.add_cache_stats(parts[3])
+                    if progress is not None:
+                        progress(done + 1, len(missing), missing[key])
+        return [GameRegistry.loaded[key] for key in keys]
+
     def compile_all_stats(self) -> None:
         '''fills self.all_stats
             this is a dictionry with the stats from each game in a list allowing us to get individual games's stats'''
@@ -95,17 +174,46 @@ class CompileStats:
         '''returns main_team if team == main team, else opponent'''
         return team if team == self.main_team else 'opponent'
 
-    def fill_games(self, N: int) -> None: 
-        '''populates the self.games list with Stats objects of the last self.N games'''
+    def fill_games(self, N: int, workers = None, progress = None) -> None: 
+        '''populates the self.games list with Stats objects of the last self.N games
+            every csv content is only loaded once per process, no matter how many folders it has been copied to.
+            the csv files are loaded in this process, or in a process pool with workers processes, see load_games.
+            progress(done, total, path) is called for every game loaded, nothing is printed if None.
+            the cache stats of the run (see gf.cache_summary) are kept in self.cache_summary, and printed if there is a progress'''
         self.games = list()
-        l = [f'{self.path}\\{x}' for x in sorted(os.listdir(self.path), reverse=True)[: N]]
-        for game_link in l:
-            print(game_link)
-            self.games.append(Stats(game_link, main_team = self.main_team))
+        if self.sql is not None:
+            warehouse = EventWarehouse()
+            games = warehouse.games(*self.sql)
+            games = games.iloc[sorted(range(len(games)), key=lambda i: os.path.basename(games['path'].iloc[i]), reverse=True)[: N]]
+            self.games = warehouse.load_stats(games, self.main_team, progress)
+            warehouse.close()
+            self.report_cache(progress)
+            return
+        if self.archive is not None:
+            archive = EventArchive()
+            game_ids = archive.game_ids(archive.slice(*self.archive))
+            game_ids = sorted(game_ids, key=lambda game_id: os.path.basename(archive.games[game_id]['path']), reverse=True)[: N]
+            self.games = archive.load_stats(game_ids, self.main_team, progress)
+            self.report_cache(progress)
+            return
+        if self.path is None:
+            l = sorted(GameRegistry().paths(**self.query), key=os.path.basename, reverse=True)[: N]
+        else:
+            l = [os.path.join(self.path, x) for x in sorted(os.listdir(self.path), reverse=True)[: N]]
+        self.games = CompileStats.load_games(l, self.main_team, workers, progress)
+        self.report_cache(progress)
+
+    def report_cache(self, progress = None) -> None:
+        '''keeps the cache stats of the run in self.cache_summary, printed if progress is given'''
+        self.cache_summary = gf.cache_summary()
+        if progress is not None:
+            print(self.cache_summary)
+        return
     
     def fill_df(self) -> pd.core.frame.DataFrame:
-        '''fills the self.big_df dataframe object by concatenating all the games' dfs'''
-        return pd.concat([game.big_df for game in self.games])
+        '''fills the self.big_df dataframe object by concatenating all the games' dfs
+            the categoricals are given the same categories first, else concat falls back to strings'''
+        return pd.concat(Game.unify_categories([game.big_df for game in self.games]))
 
     def train_expected_goals(self) -> dict:
         '''returns an expected goals dict of all shot types'''
@@ -376,11 +484,10 @@ class CompileStats:
         return i_dict
 
     def summarize_possession(self) -> dict:
-        '''returns a dict of the combined possession of the object'''
+        '''returns a dict of the combined possession of the object, in seconds'''
         poss_dict = {team : 0 for team in self.teams}
         for team in self.all_stats['possession']:
-            poss_dict[team] = sum(gf.readable_to_sec(x) for x in self.all_stats['possession'][team]) 
-            poss_dict[team] = gf.sec_to_readable(poss_dict[team])
+            poss_dict[team] = sum(self.all_stats['possession'][team]) 
         return poss_dict
     
     def summarize_scrimmages(self) -> dict:
@@ -0,0 +1,125 @@
+import numpy as np
+import pandas as pd
+
+
+class CountCube:
+    '''the number of events per (team, event, subevent, zone) of one or more halves, counted in one pass with np.unique
+        only the cells that have events are kept, as their codes along each axis and their counts, so a cube is small and sums cheaply.
+        the counting sections of Stats (duels, corners, shot types, ...) are lookups into it, and adding Stats adds their cubes'''
+
+    # class variables
+    axes = ['team', 'event', 'subevent', 'zone']
+
+    # constructor
+    def __init__(self, df = None, teams = ()) -> None:
+        '''the cube of the events in df (e.g. Stats.big_df), only the events of teams are counted, empty if df is None
+            every team gets a label even without events, missing subevents and zones get the label None'''
+        self.labels = {axis: list() for axis in CountCube.axes}
+        self.labels['team'] = list(teams)
+        # one row per cell with events, its code along each axis
+        self.cells = np.zeros((0, len(CountCube.axes)), dtype=np.int64)
+        self.counts = np.zeros(0, dtype=np.int64)
+        if df is not None:
+            team_codes = pd.Categorical(df['team'], categories=self.labels['team']).codes.astype(np.int64)
+            codes = [team_codes]
+            for axis in CountCube.axes[1:]:
+                self.labels[axis], axis_codes = CountCube.encode(df[axis])
+                codes.append(axis_codes)
+            self.cells, self.counts = np.unique(np.column_stack(codes)[team_codes >= 0], axis=0, return_counts=True)
+        return
+
+# static methods
+    def encode(column: pd.core.series.Series) -> tuple:
+        '''returns (labels, codes) of the values in column, None is the label of missing values'''
+        categorical = pd.Categorical(column).remove_unused_categories()
+        labels = categorical.categories.tolist()
+        codes = categorical.codes.astype(np.int64)
+        if (codes < 0).any():
+            codes = np.where(codes < 0, len(labels), codes)
+            labels.append(None)
+        return labels, codes
+
+    def merge(cubes: list):
+        '''returns one cube with the counts of all cubes summed, the labels of each axis are the labels of all cubes in order'''
+        merged = CountCube()
+        cubes = list(cubes)
+        if len(cubes) == 0:
+            return merged
+        merged.labels = {axis: list(dict.fromkeys(label for cube in cubes for label in cube.labels[axis])) for axis in CountCube.axes}
+        index = {axis: {label: i for i, label in enumerate(merged.labels[axis])} for axis in CountCube.axes}
+        cells = list()
+        for cube in cubes:
+            # the codes of cube along each axis in the merged labels
+            recode = [np.array([index[axis][label] for label in cube.labels[axis]], dtype=np.int64) for axis in CountCube.axes]
+            cells.append(np.column_stack([recode[i][cube.cells[:, i]] for i in range(len(CountCube.axes))]) if len(cube.counts) > 0 else cube.cells)
+        cells, inverse = np.unique(np.concatenate(cells), axis=0, return_inverse=True)
+        merged.cells = cells
+        merged.counts = np.bincount(inverse.ravel(), weights=np.concatenate([cube.counts for cube in cubes]), minlength=len(cells)).astype(np.int64)
+        return merged
+
+# dunder add, so that cubes can be summed
+    def __add__(self, other):
+        return CountCube.merge([self, other])
+
+# non-static methods
+    def mask(self, events = None, subevents = None, zones = None) -> np.ndarray:
+        '''returns True for the cells with any of events, subevents and zones, None means any'''
+        mask = np.ones(len(self.counts), dtype=bool)
+        for axis, wanted in zip(CountCube.axes[1:], [events, subevents, zones]):
+            if wanted is not None:
+                codes = [i for i, label in enumerate(self.labels[axis]) if label in wanted]
+                mask &= np.isin(self.cells[:, CountCube.axes.index(axis)], codes)
+        return mask
+
+    def count(self, events = None, subevents = None, zones = None) -> dict:
+        '''returns {team: number of events} with any of events, subevents and zones, None means any'''
+        mask = self.mask(events, subevents, zones)
+        counts = np.bincount(self.cells[mask, 0], weights=self.counts[mask], minlength=len(self.labels['team'])).astype(np.int64)
+        return dict(zip(self.labels['team'], counts.tolist()))
+
+    def count_by(self, axis: str, events = None, subevents = None, zones = None) -> dict:
+        '''returns {team: {label: number of events}} per label of axis (event, subevent or zone), only labels with events are in the inner dicts'''
+        mask = self.mask(events, subevents, zones)
+        i = CountCube.axes.index(axis)
+        counts = {team: dict() for team in self.labels['team']}
+        for team, label, n in zip(self.cells[mask, 0].tolist(), self.cells[mask, i].tolist(), self.counts[mask].tolist()):
+            label = self.labels[axis][label]
+            counts[self.labels['team'][team]][label] = counts[self.labels['team'][team]].get(label, 0) + n
+        return counts
+
+    def add(self, values: tuple, n = 1) -> None:
+        '''counts n more events in the cell of values (team, event, subevent, zone), new labels are added last on their axis
+            only the few cells with events are searched, so an event appended during a game is counted without counting the half again.
+            the arrays and labels are replaced rather than changed, a cube shared with an accumulator keeps its counts'''
+        if values[0] not in self.labels['team']:
+            return
+        cell = list()
+        for axis, value in zip(CountCube.axes, values):
+            if value not in self.labels[axis]:
+                self.labels = dict(self.labels, **{axis: self.labels[axis] + [value]})
+            cell.append(self.labels[axis].index(value))
+        found = np.flatnonzero((self.cells == cell).all(axis=1))
+        if len(found) > 0:
+            self.counts = self.counts.copy()
+            self.counts[found[0]] += n
+        else:
+            self.cells = np.vstack([self.cells, np.array([cell], dtype=np.int64)])
+            self.counts = np.append(self.counts, np.int64(n))
+        return
+
+    def dense(self) -> np.ndarray:
+        '''returns the cube as a (team x event x subevent x zone) array'''
+        array = np.zeros([len(self.labels[axis]) for axis in CountCube.axes], dtype=np.int64)
+        np.add.at(array, tuple(self.cells.T), self.counts)
+        return array
+
+
+if __name__ == '__main__':
+    import argparse
+    from get_stats import Stats
+    parser = argparse.ArgumentParser(description='prints the number of events per team and event of clean csvs, summed')
+    parser.add_argument('files', nargs='+', help='the clean csvs')
+    args = parser.parse_args()
+
+    cube = CountCube.merge([Stats(file).count_cube for file in args.files])
+    print(pd.DataFrame(cube.dense().sum(axis=(2, 3)), index=cube.labels['team'], columns=cube.labels['event']).T)
@@ -0,0 +1,137 @@
+import os
+import json
+import numpy as np
+import pandas as pd
+from get_data import Game
+from get_stats import Stats
+from game_registry import GameRegistry
+from event_warehouse import EventWarehouse
+
+
+class EventArchive:
+    '''every event in the event warehouse packed into one numpy structured array on disk, sorted by game_id
+        the file is opened with np.memmap, so opening it costs nothing and processes reading it share the same pages.
+        text fields are stored as codes into the vocabularies in the json file next to it, code 0 is a missing value'''
+
+    # class variables
+    archive_file = os.path.join(GameRegistry.data_folder, 'events.npy')
+    vocabulary_file = os.path.join(GameRegistry.data_folder, 'events.json')
+    # fields stored as codes, time is the readable time as written in the csv
+    coded_fields = ['time', 'team', 'event', 'subevent', 'zone', 'player']
+
+    # constructor
+    def __init__(self, filename = archive_file, vocabulary_filename = vocabulary_file) -> None:
+        '''opens the archive read only, makes it from the event warehouse if there is none
+            or if the games of the warehouse are not the ones it was made from (the warehouse drops and imports halves when it opens, see EventWarehouse.update)'''
+        warehouse = EventWarehouse()
+        games = {str(game_id): game for game_id, game in warehouse.game_files().items()}
+        info = EventArchive.read_info(vocabulary_filename) if os.path.isfile(filename) else None
+        if info is None or info['games'] != games:
+            EventArchive.build(filename, vocabulary_filename, warehouse)
+            info = EventArchive.read_info(vocabulary_filename)
+        warehouse.close()
+        self.events = np.load(filename, mmap_mode='r')
+        self.vocabulary = info['vocabulary']
+        # game_id -> {'hash', 'path'}, json keys are strings
+        self.games = {int(game_id): game for game_id, game in info['games'].items()}
+        self.categories = {field: pd.Index(self.vocabulary[field][1:], dtype=object) for field in EventArchive.coded_fields}
+        return
+
+# static methods
+    def read_info(vocabulary_filename = vocabulary_file) -> dict:
+        '''returns the vocabularies and games of the json file of the archive, None if there is none'''
+        if not os.path.isfile(vocabulary_filename):
+            return None
+        with open(vocabulary_filename, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def field_vocabulary(field: str, values: pd.core.series.Series) -> list:
+        '''returns the vocabulary of field, None first so that missing values get code 0
+            the categorical columns start with the same fixed vocabulary as Game.event_frame'''
+        found = [x for x in values.dropna().unique().tolist()]
+        if field in Game.categorical_columns:
+            fixed = Game.vocabulary(field)
+            return [None] + fixed + sorted(set(found) - set(fixed))
+        return [None] + sorted(found, key=lambda x: (isinstance(x, str), x))
+
+    def code_type(vocabulary: list) -> type:
+        '''returns the smallest unsigned int that fits all codes'''
+        return np.uint8 if len(vocabulary) <= 2 ** 8 else np.uint16
+
+    def build(filename = archive_file, vocabulary_filename = vocabulary_file, warehouse = None) -> None:
+        '''packs all events in the event warehouse into the archive, written to temporary files first
+            the warehouse is opened (and closed) here if it is not given'''
+        opened = warehouse is None
+        if opened:
+            warehouse = EventWarehouse()
+        events = warehouse.events()
+        games = warehouse.games()
+        if opened:
+            warehouse.close()
+        vocabulary = {field: EventArchive.field_vocabulary(field, events[field]) for field in EventArchive.coded_fields}
+        dtype = [('game_id', np.uint16), ('sec', np.int16)] + [(field, EventArchive.code_type(vocabulary[field])) for field in EventArchive.coded_fields]
+        archive = np.lib.format.open_memmap(filename + '.tmp', mode='w+', dtype=dtype, shape=(len(events),))
+        archive['game_id'] = events['game_id'].to_numpy()
+        archive['sec'] = events['sec'].to_numpy()
+        for field in EventArchive.coded_fields:
+            codes = {value: code for code, value in enumerate(vocabulary[field])}
+            archive[field] = events[field].map(lambda x: 0 if pd.isna(x) else codes[x]).to_numpy()
+        archive.flush()
+        del archive
+        # the games the archive is made from, it is made again when the warehouse has other games
+        info = {'vocabulary': vocabulary, 'games': {str(row['game_id']): {'hash': row['hash'], 'path': row['path']} for index, row in games.iterrows()}}
+        with open(vocabulary_filename + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(info, f, ensure_ascii=False)
+        os.replace(filename + '.tmp', filename)
+        os.replace(vocabulary_filename + '.tmp', vocabulary_filename)
+        return
+
+# non-static methods
+    def slice(self, first_game_id: int, last_game_id: int) -> np.ndarray:
+        '''returns the events of the games first_game_id to last_game_id (included), a view into the memmap'''
+        start, stop = np.searchsorted(self.events['game_id'], [first_game_id, last_game_id + 1])
+        return self.events[start:stop]
+
+    def game_ids(self, events: np.ndarray) -> list:
+        '''returns the game_ids found in events, in order'''
+        return [int(x) for x in np.unique(events['game_id'])]
+
+    def frame(self, events: np.ndarray) -> pd.core.frame.DataFrame:
+        '''returns events as a df in the same format as Game.read_clean_csv, the categoricals are made from the codes directly'''
+        dic = dict()
+        for field in ['time', 'team', 'event', 'subevent', 'zone']:
+            codes = events[field].astype(np.int16) - 1
+            if field == 'time':
+                dic[field] = self.categories[field].take(codes).to_numpy()
+                dic[field][codes < 0] = np.nan
+            else:
+                dic[field] = pd.Categorical.from_codes(codes, categories=self.categories[field])
+        # older files have no player column, otherwise let pandas pick the dtype just like read_csv does
+        if events['player'].any():
+            dic['player'] = pd.Series([self.vocabulary['player'][code] for code in events['player']], dtype=None)
+        dic['sec'] = events['sec'].astype(np.int32)
+        return pd.DataFrame(dic)
+
+    def load_stats(self, game_ids: list, main_team = 'iks', progress = None) -> list:
+        '''returns a Stats object for each game in game_ids (e.g. self.game_ids(self.slice(first, last))), in the same order
+            games already loaded in this process are reused. progress(done, total, path) is called as each of the others is loaded, like in CompileStats.load_games'''
+        # the csv contents not loaded yet, a copy of a half in another folder has the same hash
+        total = len({self.games[game_id]['hash'] for game_id in game_ids if (self.games[game_id]['hash'], main_team) not in GameRegistry.loaded})
+        done = 0
+        stats = list()
+        for game_id in game_ids:
+            game = self.games[game_id]
+            key = (game['hash'], main_team)
+            if key not in GameRegistry.loaded:
+                GameRegistry.loaded[key] = Stats(GameRegistry.absolute(game['path']), main_team = main_team, big_df = self.frame(self.slice(game_id, game_id)))
+                done += 1
+                if progress is not None:
+                    progress(done, total, game['path'])
+            stats.append(GameRegistry.loaded[key])
+        return stats
+
+
+if __name__ == '__main__':
+    EventArchive.build()
+    archive = EventArchive()
+    print(f'{len(archive.events)} events from {len(archive.games)} games in {EventArchive.archive_file}, {archive.events.nbytes / 1e6:.2f} MB')
@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+
+
+class EventIndex:
+    '''the row positions of every event and subevent of a half, made once from big_df
+        the positions of one event are a view into a single sorted array, so asking for the rows of an event copies nothing,
+        and big_df.take of them gives the same frame as filtering with a mask'''
+
+    # constructor
+    def __init__(self, df: pd.core.frame.DataFrame) -> None:
+        '''df is the events of a half (Stats.big_df), its event and subevent columns are indexed'''
+        self.length = len(df)
+        self.events = EventIndex.group(df['event'])
+        self.subevents = EventIndex.group(df['subevent'])
+        return
+
+# dunder len, the number of rows
+    def __len__(self) -> int:
+        return self.length
+
+# static methods
+    def group(column: pd.core.series.Series) -> dict:
+        '''returns {value: row positions} of column, the positions are in order and views into one array'''
+        categorical = pd.Categorical(column)
+        # missing values get code -1, they are put first and left out
+        codes = categorical.codes.astype(np.int64) + 1
+        order = np.argsort(codes, kind='stable')
+        ends = np.cumsum(np.bincount(codes, minlength=len(categorical.categories) + 1))
+        return {value: order[ends[i]:ends[i + 1]] for i, value in enumerate(categorical.categories.tolist())}
+
+# non-static methods
+    def rows(self, events = (), subevents = ()) -> np.ndarray:
+        '''returns the positions of the rows with any of events or any of subevents, in order'''
+        parts = [self.events[event] for event in events if event in self.events] + [self.subevents[subevent] for subevent in subevents if subevent in self.subevents]
+        if len(parts) == 0:
+            return np.zeros(0, dtype=np.int64)
+        if len(parts) == 1:
+            return parts[0]
+        return np.unique(np.concatenate(parts))
+
+    def count(self, events = (), subevents = ()) -> int:
+        '''returns the number of rows with any of events or any of subevents'''
+        return len(self.rows(events, subevents))
+
+
+if __name__ == '__main__':
+    import argparse
+    from get_data import Game
+    parser = argparse.ArgumentParser(description='prints the number of rows of every event and subevent of a clean csv')
+    parser.add_argument('file', help='the clean csv')
+    args = parser.parse_args()
+
+    index = EventIndex(Game.read_clean_csv(args.file))
+    for event, rows in index.events.items():
+        print(f'{event}: {len(rows)}')
+    for subevent, rows in index.subevents.items():
+        print(f'  {subevent}: {len(rows)}')
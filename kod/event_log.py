@@ -0,0 +1,180 @@
+import csv
+import io
+import os
+import re
+import time
+import pandas as pd
+import general_functions as gf
+
+
+class EventLog:
+    '''append-only writer for the raw event,time csv that Game.collector_raw makes
+        the file is opened once and every event is appended as one line,
+        the format is the same as before so Game.clean_csv can read it as usual'''
+
+    # class variables
+    keys = ['event', 'time']
+
+    # constructor
+    def __init__(self, filename: str, flush_every = 1, fsync_interval = 5.0) -> None:
+        '''opens filename for appending. flush_every is how many events we write before flushing to the os,
+            fsync_interval is how many seconds may pass before the data is forced down to disk.
+            if the file already exists (we crashed or restarted) we keep going at the end of it'''
+        self.filename = EventLog.csv_name(filename)
+        self.flush_every = flush_every
+        self.fsync_interval = fsync_interval
+        self.number_of_events = 0
+        self.unflushed = 0
+
+        # a crashed collector may have left half a line at the end
+        self.dropped = EventLog.recover(self.filename)
+        new_file = not os.path.isfile(self.filename) or os.path.getsize(self.filename) == 0
+        self.resumed_events = 0 if new_file else len(EventLog.read_rows(self.filename))
+
+        self.file = open(self.filename, 'a', encoding='utf-8', newline='')
+        self.writer = csv.writer(self.file, lineterminator='\n')
+        if new_file:
+            self.writer.writerow(EventLog.keys)
+            self.sync()
+        self.last_fsync = time.time()
+        return
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+        return
+
+# static methods
+    def csv_name(filename: str) -> str:
+        '''makes sure the filename ends in .csv'''
+        if len(filename) <= 4 or filename[-4:] != '.csv':
+            filename += '.csv'
+        return filename
+
+    def complete_line(line: str) -> bool:
+        '''returns True if line is a full row, two fields where one is a whole MM:SS or H:MM:SS time (or the header)
+            a time cut off mid write, like 12:3, does not count, see gf.full_readable_pattern.
+            some hand made files have the columns in the order time,event'''
+        row = next(csv.reader([line]), [])
+        if len(row) != 2:
+            return False
+        return row == EventLog.keys or any(re.match(gf.full_readable_pattern, x) is not None for x in row)
+
+    def split_tail(text: str) -> tuple:
+        '''returns (text, tail) where tail is a last line that was cut off mid write, else empty'''
+        if text == '' or text.endswith('\n'):
+            return text, ''
+        i = text.rfind('\n') + 1
+        # hand edited files often lack the last newline, they are still fine
+        if EventLog.complete_line(text[i:]):
+            return text, ''
+        return text[:i], text[i:]
+
+    def recover(filename: str) -> str:
+        '''crash recovery for a log we are about to append to
+            drops a truncated last line, or terminates a complete one, and returns whatever was dropped'''
+        if not os.path.isfile(filename):
+            return ''
+        # work on bytes so that a character cut in half can't move the cut
+        with open(filename, 'rb') as f:
+            data = f.read()
+        if data == b'' or data.endswith(b'\n'):
+            return ''
+        i = data.rfind(b'\n') + 1
+        tail = data[i:].decode('utf-8', errors='replace')
+        if EventLog.complete_line(tail):
+            with open(filename, 'ab') as f:
+                f.write(b'\n')
+            return ''
+        print(f'dropping truncated last line in {filename}: {tail!r}')
+        with open(filename, 'r+b') as f:
+            f.truncate(i)
+        return tail
+
+    def read_rows(filename: str) -> list:
+        '''returns the event rows of the log as a list of [event, time], tolerates a truncated last line'''
+        with open(EventLog.csv_name(filename), 'r', encoding='utf-8', newline='', errors='replace') as f:
+            text, tail = EventLog.split_tail(f.read())
+        return [row for row in csv.reader(io.StringIO(text)) if row and row != EventLog.keys]
+
+    def read_df(filename: str) -> pd.core.frame.DataFrame:
+        '''returns the log as a df just like gf.read_csv_as_df, but ignores a truncated last line'''
+        filename = filename if os.path.isfile(filename) else EventLog.csv_name(filename)
+        with open(filename, 'r', encoding='utf-8', newline='', errors='replace') as f:
+            text, tail = EventLog.split_tail(f.read())
+        if tail != '':
+            print(f'ignoring truncated last line in {filename}: {tail!r}')
+        return pd.read_csv(io.StringIO(text), engine='python')
+
+    def tail(filename: str, poll_interval = 0.5, timeout = None):
+        '''yields [event, time] for every row of the log, first the rows already written and then new ones as they are appended,
+            e.g. while collector_raw is still running. a line is only read once it is complete.
+            ends at the end of the file once the stop row that ends a half has been read,
+            or when nothing new has come for timeout seconds (None waits forever)'''
+        filename = filename if os.path.isfile(filename) else EventLog.csv_name(filename)
+        # some hand made files have the columns in the order time,event, the header tells us
+        order = None
+        buffer = b''
+        stopped = False
+        last_read = time.time()
+        with open(filename, 'rb') as f:
+            while True:
+                data = f.read()
+                done = data == b'' and (stopped or timeout is not None and time.time() - last_read >= timeout)
+                if data == b'' and not done:
+                    time.sleep(poll_interval)
+                    continue
+                last_read = time.time()
+                # work on bytes so that a character cut in half is only decoded once the whole line is there
+                lines = (buffer + data).split(b'\n')
+                buffer = lines.pop()
+                # when we give up, hand edited files often lack the last newline
+                if done and EventLog.complete_line(buffer.decode('utf-8', errors='replace')):
+                    lines.append(buffer)
+                for line in lines:
+                    row = next(csv.reader([line.decode('utf-8', errors='replace').rstrip('\r')]), [])
+                    if order is None:
+                        header = set(EventLog.keys) <= set(row)
+                        order = [row.index(key) for key in EventLog.keys] if header else [0, 1]
+                        if header:
+                            continue
+                    if len(row) == 0:
+                        continue
+                    # a mistyped separator leaves the time in the event field, the row is kept without a time like read_csv does
+                    row += [''] * (2 - len(row))
+                    event, t = row[order[0]], row[order[1]] if row[order[1]] != '' else None
+                    stopped = stopped or event.strip().lower() == 'stop'
+                    yield [event, t]
+                if done:
+                    return
+
+# non-static methods
+    def append(self, event: str, t: str) -> None:
+        '''appends one event to the end of the file'''
+        self.writer.writerow([event, t])
+        self.number_of_events += 1
+        self.unflushed += 1
+        if self.unflushed >= self.flush_every:
+            self.file.flush()
+            self.unflushed = 0
+        # forcing data down to disk is the slow part, so only do it every now and then
+        if time.time() - self.last_fsync >= self.fsync_interval:
+            self.sync()
+        return
+
+    def sync(self) -> None:
+        '''flushes and forces everything written so far down to disk'''
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.unflushed = 0
+        self.last_fsync = time.time()
+        return
+
+    def close(self) -> None:
+        '''syncs and closes the file, safe to call more than once'''
+        if not self.file.closed:
+            self.sync()
+            self.file.close()
+        return
@@ -0,0 +1,161 @@
+import os
+import sqlite3
+import pandas as pd
+import general_functions as gf
+from get_data import Game
+from get_stats import Stats
+from game_registry import GameRegistry
+
+
+class EventWarehouse:
+    '''all halves in the game registry in one sqlite database, a games table and an events table
+        meant for questions across many games, like all corners against edsbyn outdoors, without parsing every csv again.
+        the zones are stored as written in the csv, Stats flips them when a game is loaded'''
+
+    # class variables
+    database_file = os.path.join(GameRegistry.data_folder, 'events.sqlite')
+    schema = '''
+        CREATE TABLE IF NOT EXISTS games (
+            game_id INTEGER PRIMARY KEY,
+            hash TEXT UNIQUE NOT NULL,
+            path TEXT, date TEXT, home TEXT, away TEXT, half TEXT, tags TEXT,
+            main_version INTEGER);
+        CREATE TABLE IF NOT EXISTS events (
+            game_id INTEGER NOT NULL REFERENCES games (game_id),
+            row INTEGER NOT NULL,
+            time TEXT, sec INTEGER, team TEXT, event TEXT, subevent TEXT, zone TEXT, player,
+            PRIMARY KEY (game_id, row));
+        CREATE INDEX IF NOT EXISTS events_game_event ON events (game_id, event);
+        CREATE INDEX IF NOT EXISTS events_game_team ON events (game_id, team);
+        CREATE INDEX IF NOT EXISTS events_event_zone ON events (event, zone);
+        '''
+    game_columns = ['hash', 'path', 'date', 'home', 'away', 'half', 'tags', 'main_version']
+    event_columns = ['time', 'team', 'event', 'subevent', 'zone', 'player']
+
+    # constructor
+    def __init__(self, filename = database_file, update = False) -> None:
+        '''opens the database, it is updated from the registry if it is new, update or the registry has other halves than the database'''
+        self.filename = filename
+        new = not os.path.isfile(filename)
+        self.connection = sqlite3.connect(filename)
+        self.connection.executescript(EventWarehouse.schema)
+        registry = GameRegistry()
+        if new or update or set(registry.df['hash']) != self.hashes():
+            self.update(registry)
+        return
+
+# static methods
+    def where(tag = None, opponent = None, start = None, end = None, half = None, event = None) -> tuple:
+        '''returns (query, params) for games and events, with the same conditions as GameRegistry.find
+            event only works with events, without a tag only one version of each half is included'''
+        conditions, params = ['1'], list()
+        if tag is not None:
+            for t in [tag] if isinstance(tag, str) else tag:
+                conditions.append("';' || g.tags || ';' LIKE ?")
+                params.append(f'%;{t};%')
+        else:
+            conditions.append('g.main_version = 1')
+        if opponent is not None:
+            conditions.append('(lower(g.home) LIKE ? OR lower(g.away) LIKE ?)')
+            params += [f'%{opponent.lower()}%'] * 2
+        if start is not None:
+            conditions.append('g.date >= ?')
+            params.append(GameRegistry.normalize_date(start))
+        if end is not None:
+            conditions.append('g.date <= ?')
+            params.append(GameRegistry.normalize_date(end))
+        if half is not None:
+            conditions.append('g.half = ?')
+            params.append(str(half))
+        if event is not None:
+            conditions.append('e.event = ?')
+            params.append(event)
+        return ' AND '.join(conditions), params
+
+    def text_frame(df: pd.core.frame.DataFrame) -> pd.core.frame.DataFrame:
+        '''returns the columns of a clean csv the way we store them, text for the categorical ones and None for missing'''
+        df = df.reindex(columns=EventWarehouse.event_columns).copy()
+        for column in Game.categorical_columns + ['time']:
+            df[column] = Game.as_text(df[column])
+        # astype(object) gives python ints and floats that sqlite can store
+        return df.astype(object).where(df.notna(), None)
+
+# non-static methods
+    def hashes(self) -> set:
+        '''returns the hashes of the games in the database'''
+        return {h for (h,) in self.connection.execute('SELECT hash FROM games')}
+
+    def game_files(self) -> dict:
+        '''returns game_id -> {'hash', 'path'} of the games in the database, what the event archive was made from (see EventArchive)'''
+        return {game_id: {'hash': h, 'path': path} for game_id, h, path in self.connection.execute('SELECT game_id, hash, path FROM games')}
+
+    def update(self, registry = None) -> None:
+        '''imports the halves in the registry that are not in the database yet and updates tags and paths of the others
+            halves that are no longer in the registry (an edited or replaced csv has a new hash) are deleted with their events'''
+        if registry is None:
+            registry = GameRegistry()
+        main_versions = set(GameRegistry.one_version_per_half(registry.df)['hash'])
+        known = dict(self.connection.execute('SELECT hash, game_id FROM games').fetchall())
+        with self.connection:
+            for index, row in registry.df.iterrows():
+                values = [row[key] for key in GameRegistry.keys] + [int(row['hash'] in main_versions)]
+                if row['hash'] in known:
+                    self.connection.execute('UPDATE games SET path = ?, date = ?, home = ?, away = ?, half = ?, tags = ?, main_version = ? WHERE hash = ?',
+                                            values[1:] + [row['hash']])
+                    continue
+                try:
+                    df = EventWarehouse.text_frame(gf.read_csv_as_df(GameRegistry.absolute(row['path'])))
+                except Exception as e:
+                    print(f'unable to import {row["path"]}: {e}')
+                    continue
+                game_id = self.connection.execute(f'INSERT INTO games ({", ".join(EventWarehouse.game_columns)}) VALUES ({", ".join("?" * 8)})',
+                                                  values).lastrowid
+                seconds = gf.readable_to_sec_array(df['time']).tolist()
+                self.connection.executemany('INSERT INTO events VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                                            [[game_id, i, t, sec, *rest]
+                                             for i, ((t, *rest), sec) in enumerate(zip(df.values.tolist(), seconds))])
+            hashes = set(registry.df['hash'])
+            stale = [game_id for h, game_id in known.items() if h not in hashes]
+            if len(stale) > 0:
+                self.connection.execute(f'DELETE FROM events WHERE game_id IN ({", ".join("?" * len(stale))})', stale)
+                self.connection.execute(f'DELETE FROM games WHERE game_id IN ({", ".join("?" * len(stale))})', stale)
+        return
+
+    def games(self, query = '1', params = ()) -> pd.core.frame.DataFrame:
+        '''returns the games that match query, a WHERE clause on the games table g, e.g. from EventWarehouse.where'''
+        return pd.read_sql_query(f'SELECT g.* FROM games g WHERE {query} ORDER BY g.date, g.path', self.connection, params=list(params))
+
+    def events(self, query = '1', params = ()) -> pd.core.frame.DataFrame:
+        '''returns the events that match query, a WHERE clause on the events e and games g tables, together with their game'''
+        return pd.read_sql_query(f'SELECT g.date, g.home, g.away, g.half, e.* FROM events e JOIN games g USING (game_id) '
+                                 f'WHERE {query} ORDER BY e.game_id, e.row', self.connection, params=list(params))
+
+    def load_stats(self, games: pd.core.frame.DataFrame, main_team = 'iks', progress = None) -> list:
+        '''returns a Stats object for each row in games (from self.games), in the same order
+            only the events of games that have not been loaded in this process are fetched, and in one query.
+            progress(done, total, path) is called as each of those games is loaded, like in CompileStats.load_games'''
+        missing = [row['game_id'] for index, row in games.iterrows() if (row['hash'], main_team) not in GameRegistry.loaded]
+        if len(missing) > 0:
+            events = pd.read_sql_query(f'SELECT * FROM events WHERE game_id IN ({", ".join("?" * len(missing))}) ORDER BY game_id, row',
+                                       self.connection, params=missing)
+            events_per_game = {game_id: df for game_id, df in events.groupby('game_id')}
+            for done, (index, row) in enumerate(games.loc[games['game_id'].isin(missing)].iterrows()):
+                df = events_per_game[row['game_id']][EventWarehouse.event_columns].reset_index(drop=True)
+                # older files have no player column
+                if df['player'].isna().all():
+                    df = df.drop(columns='player')
+                GameRegistry.loaded[(row['hash'], main_team)] = Stats(GameRegistry.absolute(row['path']), main_team = main_team, big_df = Game.event_frame(df))
+                if progress is not None:
+                    progress(done + 1, len(missing), row['path'])
+        return [GameRegistry.loaded[(row['hash'], main_team)] for index, row in games.iterrows()]
+
+    def close(self) -> None:
+        '''closes the database'''
+        self.connection.close()
+        return
+
+
+if __name__ == '__main__':
+    warehouse = EventWarehouse(update = True)
+    print(f'{warehouse.connection.execute("SELECT count(*) FROM games").fetchone()[0]} games and '
+          f'{warehouse.connection.execute("SELECT count(*) FROM events").fetchone()[0]} events in {warehouse.filename}')
@@ -0,0 +1,165 @@
+import os
+import re
+import general_functions as gf
+import pandas as pd
+from get_stats import Stats
+
+
+class GameRegistry:
+    '''keeps track of every unique half in the data folder, one row per csv content (sha1 of the file)
+        the folders in data/compile hold copies of the same clean csvs, here those folder names are tags instead,
+        so a half that has been copied into six folders is one row with six tags and is only loaded once'''
+
+    # class variables
+    data_folder = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data')
+    registry_file = os.path.join(data_folder, 'registry.csv')
+    keys = ['hash', 'path', 'date', 'home', 'away', 'half', 'tags']
+    # 20220930 IK Sirius - Villa Lidköping halvlek 1 clean.csv
+    name_pattern = re.compile(r'^(\d{4})-?(\d{2})-?(\d{2}) (.+?) - (.+?) halvlek ([\d.]+)')
+    # Stats objects made in this process, by (hash, main_team)
+    loaded = dict()
+
+    # constructor
+    def __init__(self, filename = registry_file) -> None:
+        '''reads the registry, if there is none yet we scan the data folder and make it'''
+        self.filename = filename
+        if os.path.isfile(filename):
+            self.df = pd.read_csv(filename, dtype=str, keep_default_na=False)
+        else:
+            self.df = pd.DataFrame({key: [] for key in GameRegistry.keys}, dtype=str)
+            self.scan()
+        return
+
+# static methods
+    def absolute(path: str) -> str:
+        '''returns the full path of a registry path, registry paths are relative to data and use /'''
+        return os.path.join(GameRegistry.data_folder, *path.split('/'))
+
+    def parse_name(filename: str) -> dict:
+        '''returns date, home, away and half from the filename, empty strings for what we can't find'''
+        match = GameRegistry.name_pattern.match(os.path.basename(filename))
+        if match is None:
+            return {'date': '', 'home': '', 'away': '', 'half': ''}
+        year, month, day, home, away, half = match.groups()
+        return {'date': f'{year}-{month}-{day}', 'home': home, 'away': away, 'half': half}
+
+    def normalize_date(date: str) -> str:
+        '''returns YYYYMMDD or YYYY-MM-DD as YYYY-MM-DD'''
+        date = str(date).replace('-', '')
+        return f'{date[:4]}-{date[4:6]}-{date[6:8]}'
+
+    def find_files() -> list:
+        '''returns (path, tag) for every clean csv in the data folder
+            data/2023/clean/x.csv gets the tag 2023 and data/compile/2023/inomhus/x.csv the tag inomhus
+            the ambiguity files a batch clean leaves next to the clean csvs are not games'''
+        files = list()
+        for season in sorted(os.listdir(GameRegistry.data_folder)):
+            clean = os.path.join(GameRegistry.data_folder, season, 'clean')
+            if season != 'compile' and os.path.isdir(clean):
+                files += [(f'{season}/clean/{x}', season) for x in sorted(os.listdir(clean)) if x.endswith('.csv') and not x.endswith(' ambiguities.csv')]
+        compile_folder = os.path.join(GameRegistry.data_folder, 'compile')
+        if os.path.isdir(compile_folder):
+            for season in sorted(os.listdir(compile_folder)):
+                for tag in sorted(os.listdir(os.path.join(compile_folder, season))):
+                    folder = os.path.join(compile_folder, season, tag)
+                    if os.path.isdir(folder):
+                        files += [(f'compile/{season}/{tag}/{x}', tag) for x in sorted(os.listdir(folder)) if x.endswith('.csv')]
+        return files
+
+    def split_tags(tags: str) -> list:
+        '''returns the tags column as a list'''
+        return [tag for tag in tags.split(';') if tag != '']
+
+    def one_version_per_half(df: pd.core.frame.DataFrame) -> pd.core.frame.DataFrame:
+        '''returns df with only one row for each half
+            some halves were fixed after they were copied to data/compile, we keep the version most folders use
+            (on a tie the one in the season folder). halves whose name we can't parse are all kept'''
+        df = df.assign(number_of_tags=df['tags'].map(lambda tags: len(GameRegistry.split_tags(tags))),
+                        in_compile=df['path'].str.startswith('compile/'),
+                        half_key=df['date'] + '|' + df['home'] + '|' + df['away'] + '|' + df['half'])
+        df.loc[df['date'] == '', 'half_key'] = df['path']
+        df = df.sort_values(['number_of_tags', 'in_compile'], ascending=[False, True]).drop_duplicates('half_key')
+        return df.drop(columns=['number_of_tags', 'in_compile', 'half_key']).sort_index()
+
+    def load(filename: str, main_team = 'iks') -> Stats:
+        '''returns the Stats object of filename, made at most once per process for each csv content'''
+        key = (gf.file_hash(filename), main_team)
+        if key not in GameRegistry.loaded:
+            GameRegistry.loaded[key] = Stats(filename, main_team = main_team)
+        return GameRegistry.loaded[key]
+
+# non-static methods
+    def scan(self) -> None:
+        '''adds every csv in the data folder that is not in the registry yet and adds the folder tags to the ones that are
+            tags added by hand are kept'''
+        rows = {row['hash']: dict(row) for index, row in self.df.iterrows()}
+        for path, tag in GameRegistry.find_files():
+            h = gf.file_hash(GameRegistry.absolute(path))
+            if h not in rows:
+                rows[h] = {'hash': h, 'path': path, **GameRegistry.parse_name(path), 'tags': ''}
+            # the copy in a season folder is the original, the compile folders are copies
+            elif rows[h]['path'].startswith('compile/') and not path.startswith('compile/'):
+                rows[h]['path'] = path
+            tags = GameRegistry.split_tags(rows[h]['tags'])
+            if tag not in tags:
+                rows[h]['tags'] = ';'.join(tags + [tag])
+        self.df = pd.DataFrame(list(rows.values()), columns=GameRegistry.keys).sort_values(['date', 'path'], ignore_index=True)
+        self.save()
+        return
+
+    def save(self) -> None:
+        '''writes the registry to its csv'''
+        self.df.to_csv(self.filename, index=False)
+        return
+
+    def find(self, tag = None, opponent = None, start = None, end = None, half = None) -> pd.core.frame.DataFrame:
+        '''returns the rows that match all of the given conditions
+            tag can be one tag or a list where all of them must match, opponent is part of a team name (case insensitive),
+            start and end are dates as YYYYMMDD or YYYY-MM-DD and are included
+            without a tag each half is only returned once, see one_version_per_half'''
+        mask = pd.Series(True, index=self.df.index)
+        if tag is not None:
+            for t in [tag] if isinstance(tag, str) else tag:
+                mask &= self.df['tags'].map(lambda tags: t in GameRegistry.split_tags(tags))
+        if opponent is not None:
+            mask &= self.df['home'].str.lower().str.contains(opponent.lower(), regex=False) | self.df['away'].str.lower().str.contains(opponent.lower(), regex=False)
+        if start is not None:
+            mask &= self.df['date'] >= GameRegistry.normalize_date(start)
+        if end is not None:
+            mask &= self.df['date'] <= GameRegistry.normalize_date(end)
+        if half is not None:
+            mask &= self.df['half'] == str(half)
+        if tag is None:
+            return GameRegistry.one_version_per_half(self.df.loc[mask])
+        return self.df.loc[mask]
+
+    def paths(self, **query) -> list:
+        '''returns the full paths of the csvs that match query, see find'''
+        return [GameRegistry.absolute(path) for path in self.find(**query)['path']]
+
+    def add_tag(self, new_tag: str, **query) -> int:
+        '''adds new_tag to every row that matches query and saves, returns the number of rows tagged'''
+        rows = self.find(**query).index
+        for index in rows:
+            tags = GameRegistry.split_tags(self.df.at[index, 'tags'])
+            if new_tag not in tags:
+                self.df.at[index, 'tags'] = ';'.join(tags + [new_tag])
+        self.save()
+        return len(rows)
+
+    def remove_tag(self, old_tag: str, **query) -> int:
+        '''removes old_tag from every row that matches query and saves, returns the number of rows changed
+            a tag in query (one or a list) narrows the rows further, only rows with old_tag and those tags are changed'''
+        tag = query.pop('tag', None)
+        tags = [old_tag] + ([] if tag is None else [tag] if isinstance(tag, str) else list(tag))
+        rows = self.find(tag=tags, **query).index
+        for index in rows:
+            self.df.at[index, 'tags'] = ';'.join(t for t in GameRegistry.split_tags(self.df.at[index, 'tags']) if t != old_tag)
+        self.save()
+        return len(rows)
+
+
+if __name__ == '__main__':
+    registry = GameRegistry()
+    registry.scan()
+    print(f'{len(registry.df)} unique halves in {registry.filename}')
@@ -1,10 +1,17 @@
 # functions that can be used throughout the classes
 import pandas as pd
+import numpy as np
 import time 
 import datetime
 import os
+import hashlib
+import re
 import constants
 
+# binary cache of the csv files read by read_csv_as_df, one npz file per csv, and of the Stats snapshots
+cache_folder = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'cache')
+cache_stats = {'hits': 0, 'misses': 0, 'bytes read': 0, 'bytes written': 0}
+
 # other 
 def combine_dictionaries(dict_1: dict, dict_2: dict) -> dict:
     '''combines the content of the two dictionaries into a new one
@@ -31,19 +38,132 @@ def append_clean(filename: str, change_dirr = True) -> str:
     else:
         return filename[:-4] + ' clean.csv'
 
-def read_csv_as_df(filename: str) -> pd.core.frame.DataFrame:
-    '''returns the csv as a df object'''
-    try:
+def csv_path(filename: str) -> str:
+    '''returns filename, with .csv added if it was left out'''
+    if not os.path.isfile(filename) and os.path.isfile(filename + '.csv'):
+        return filename + '.csv'
+    return filename
+
+def read_csv_as_df(filename: str, use_cache = True) -> pd.core.frame.DataFrame:
+    '''returns the csv as a df object
+        if use_cache we read a binary copy of the csv instead, as long as the csv has not changed since it was made'''
+    filename = csv_path(filename)
+    if not use_cache or not os.path.isfile(filename):
         return pd.read_csv(filename, engine='python')
-    except:
-        return pd.read_csv(filename + '.csv', engine='python')
+    key = cache_key(filename)
+    df = read_df_cache(filename, key)
+    if df is not None:
+        return df
+    cache_stats['misses'] += 1
+    df = pd.read_csv(filename, engine='python')
+    write_df_cache(df, filename, key)
+    return df
+
+# binary cache
+def cache_key(filename: str) -> str:
+    '''returns what the cached copy of filename has to match, the path together with mtime and size'''
+    st = os.stat(filename)
+    return f'{os.path.abspath(filename)}|{st.st_mtime_ns}|{st.st_size}'
+
+def file_hash(filename: str) -> str:
+    '''returns the sha1 of the content of filename'''
+    with open(filename, 'rb') as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+def snapshot_name(filename: str, *keys) -> str:
+    '''returns the path of the Stats snapshot of filename, there is one for each combination of keys (like main_team and N)'''
+    h = hashlib.sha1('|'.join([os.path.abspath(filename)] + [str(key) for key in keys]).encode('utf-8')).hexdigest()
+    return os.path.join(cache_folder, h + '.stats.npz')
+
+def cache_name(filename: str) -> str:
+    '''returns the path of the cached copy of filename
+        named after the path only, so a changed csv overwrites its old copy instead of leaving it behind'''
+    h = hashlib.sha1(os.path.abspath(filename).encode('utf-8')).hexdigest()
+    return os.path.join(cache_folder, h + '.npz')
+
+def read_df_cache(filename: str, key: str) -> pd.core.frame.DataFrame:
+    '''returns the cached df of filename, or None if there is no copy matching key'''
+    name = cache_name(filename)
+    if not os.path.isfile(name):
+        return None
+    try:
+        with np.load(name, allow_pickle=False) as data:
+            if str(data['key']) != key:
+                return None
+            columns = data['columns'].tolist()
+            df = pd.DataFrame({col: cached_array(data, f'c{i}') for i, col in enumerate(columns)}, columns=columns)
+            # rows with one field too many make read_csv use the first field as index
+            if 'index' in data:
+                df.index = cached_array(data, 'index')
+    except Exception as e:
+        print(f'ignoring broken cache file {name}: {e}')
+        return None
+    cache_stats['hits'] += 1
+    cache_stats['bytes read'] += os.path.getsize(name)
+    return df
+
+def write_df_cache(df: pd.core.frame.DataFrame, filename: str, key: str) -> None:
+    '''saves a binary copy of df as the cache of filename
+        written to a temporary file first so that a crash never leaves half a cache file'''
+    arrays = {'key': np.array(key), 'columns': np.array([str(col) for col in df.columns])}
+    for i, col in enumerate(df.columns):
+        arrays.update(array_for_cache(df[col], f'c{i}'))
+    if not isinstance(df.index, pd.RangeIndex):
+        arrays.update(array_for_cache(pd.Series(df.index), 'index'))
+    name = cache_name(filename)
+    try:
+        os.makedirs(cache_folder, exist_ok=True)
+        with open(name + '.tmp', 'wb') as f:
+            np.savez(f, **arrays)
+        os.replace(name + '.tmp', name)
+    except OSError as e:
+        print(f'unable to cache {filename}: {e}')
+        return
+    cache_stats['bytes written'] += os.path.getsize(name)
+    return
+
+def array_for_cache(values: pd.core.series.Series, name: str) -> dict:
+    '''returns the arrays we save for one column
+        text columns become fixed width strings plus a mask of the empty cells, so no pickling is needed'''
+    if values.dtype == object:
+        return {name: values.fillna('').astype(str).to_numpy().astype(str), 'n' + name: values.isna().to_numpy()}
+    return {name: values.to_numpy()}
+
+def cached_array(data, name: str) -> np.ndarray:
+    '''returns the column name from the loaded npz data, undoing array_for_cache'''
+    values = data[name]
+    if 'n' + name in data:
+        values = values.astype(object)
+        values[data['n' + name]] = np.nan
+    return values
+
+def add_cache_stats(counts: dict) -> None:
+    '''adds the cache stats of another process (counted the same way, see cache_stats_since) to the cache stats of this run'''
+    for key, value in counts.items():
+        cache_stats[key] += value
+    return
+
+def cache_stats_since(before: dict) -> dict:
+    '''returns what the cache stats of this process have counted since before, a copy of cache_stats'''
+    return {key: cache_stats[key] - before[key] for key in cache_stats}
+
+def cache_summary() -> str:
+    '''returns the cache stats of this run as a readable line'''
+    return (f'csv cache: {cache_stats["hits"]} hits, {cache_stats["misses"]} misses, '
+            f'{cache_stats["bytes read"] / 1e6:.2f} MB read, {cache_stats["bytes written"] / 1e6:.2f} MB written')
 
 def save_data_to_csv(filename: str, keys: list, values: list) -> None:
     # makes sure path is good
     if len(filename) <= 4 or filename[-4:] != '.csv':
         filename += '.csv'
     df = make_df(keys, values)
-    df.to_csv(filename, index=False) 
+    replace_csv(df, filename)
+    return
+
+def replace_csv(df: pd.core.frame.DataFrame, filename: str) -> None:
+    '''writes df to filename through a temporary file, so a crash or a reader at the same time never sees half a csv'''
+    df.to_csv(filename + '.tmp', index=False)
+    os.replace(filename + '.tmp', filename)
     return
 
 def make_df(keys: list, values: list) -> pd.core.frame.DataFrame:
@@ -54,6 +174,11 @@ def make_df(keys: list, values: list) -> pd.core.frame.DataFrame:
     return pd.DataFrame(dic)
 
 # time 
+# hours and minutes are optional, int() in readable_to_sec accepts spaces around the numbers
+readable_pattern = r'^\s*(?:(?:(\d+)\s*:\s*)?(\d+)\s*:\s*)?(\d+)\s*$'
+# a whole MM:SS or H:MM:SS time with two digit minutes and seconds, what the collector writes. a time cut off mid write (12:3, 0:12) does not match
+full_readable_pattern = r'^\s*(?:(\d+)\s*:\s*)?(\d{2})\s*:\s*(\d{2})\s*$'
+
 def readable_to_sec(t: str) -> int:
     '''returns the readable time in seconds
         returns False if unable to convert t'''
@@ -62,6 +187,22 @@ def readable_to_sec(t: str) -> int:
     except:
         return False
 
+def readable_to_sec_array(values) -> np.ndarray:
+    '''returns the readable times (S, M:SS or H:MM:SS) as an int32 array of seconds, -1 where a time can't be read
+        the whole column is parsed at once, so this is what we use when a csv is loaded instead of readable_to_sec per row'''
+    parts = pd.Series(values, dtype=object).astype(str).str.extract(readable_pattern)
+    numbers = parts.apply(pd.to_numeric).fillna(0).to_numpy()
+    seconds = numbers @ np.array([3600, 60, 1])
+    return np.where(parts[2].notna().to_numpy(), seconds, -1).astype(np.int32)
+
+def readable_time_to_sec(t) -> int:
+    '''returns one readable time in seconds the way readable_to_sec_array reads it, -1 if it can't be read
+        for a single event, like one appended during a game, where a pandas parse of one value costs more than the rest of the work'''
+    match = re.match(readable_pattern, str(t))
+    if match is None:
+        return -1
+    return sum(int(x or 0) * factor for x, factor in zip(match.groups(), [3600, 60, 1]))
+
 def sec_to_readable(t: float) -> str:
     '''returns the seconds as readable time'''
     return str(datetime.timedelta(seconds = t//1))
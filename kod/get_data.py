@@ -1,7 +1,12 @@
 import pandas as pd 
+import numpy as np
 import time
 import datetime
+import os
+import hashlib
+from collections import Counter
 import general_functions as gf
+from event_log import EventLog
 
 class Game:
     
@@ -21,9 +26,17 @@ class Game:
 
     players = {str(i) for i in range(1, 100)}
 
+    # columns of a clean csv that are read as categoricals, see read_clean_csv
+    categorical_columns = ['team', 'event', 'subevent', 'zone']
+
+    # columns of the ambiguity file that a batch clean_csv leaves behind
+    ambiguity_keys = ['row', 'field', 'entry', 'time']
+
     # constructor
     def __init__(self, teams: set) -> None:
         self.teams = teams
+        # token -> {field: value}, so each raw token is one dict lookup instead of a scan of every set
+        self.token_table = Game.make_token_table(teams)
         return
 
     # static methods 
@@ -36,6 +49,154 @@ class Game:
         if gf.readable_to_sec(new_time) > 45*60:
             new_time = gf.sec_to_readable(gf.readable_to_sec(new_time) - 45*60)
         return t - gf.readable_to_sec(new_time)
+
+    def make_token_table(teams: set) -> dict:
+        '''returns the lookup table from a lowercase raw token to the fields it can fill
+            subevents are stored under the field ('subevent', event) since they depend on the event'''
+        table = dict()
+        for team in teams:
+            table.setdefault(team, dict())['team'] = team
+        for event in Game.events:
+            table.setdefault(event, dict())['event'] = event
+        for event in Game.events_and_their_subevents:
+            for subevent in Game.events_and_their_subevents[event]:
+                table.setdefault(subevent, dict())[('subevent', event)] = subevent
+        for zone in Game.zones:
+            table.setdefault(zone, dict())['zone'] = zone
+        for player in Game.players:
+            table.setdefault(player, dict())['player'] = player
+        return table
+
+    def ambiguities_name(filename_out: str) -> str:
+        '''returns the name of the ambiguity file that belongs to the clean csv filename_out'''
+        return filename_out[:-4] + ' ambiguities.csv'
+
+    def vocabulary_hash() -> str:
+        '''returns a fingerprint of everything the token table can find, it changes when e.g. a subevent is added'''
+        words = [sorted(Game.events), sorted((event, sorted(subevents)) for event, subevents in Game.events_and_their_subevents.items()),
+                 sorted(Game.zones), sorted(Game.players)]
+        return hashlib.sha1(repr(words).encode('utf-8')).hexdigest()
+
+    def guess_teams(df: pd.core.frame.DataFrame, n = 2) -> set:
+        '''returns the n most common raw tokens that are not in the token table, not numbers and not del
+            the team abbreviations are typed on almost every row, so they are usually the ones we get'''
+        known = Game.make_token_table(set())
+        tokens = Counter(token for entry in df['event'].astype(str).str.lower().str.split() for token in entry
+                         if token not in known and token != 'del' and not token.isdigit())
+        return {token for token, count in tokens.most_common(n)}
+
+    def previous_answers(filename_out: str, clean_df: pd.core.frame.DataFrame) -> pd.core.frame.DataFrame:
+        '''returns team, event and subevent from an earlier clean of the same raw file, None where there is no answer
+            only used if the earlier clean has the same rows as clean_df (the same times in the same order),
+            rows that are still in its ambiguity file were never answered and don't count'''
+        try:
+            previous = gf.read_csv_as_df(filename_out)
+        except Exception:
+            # no earlier clean, or one we can't read
+            return None
+        if len(previous) != len(clean_df) or not all(key in previous.columns for key in ['time', 'team', 'event', 'subevent']):
+            return None
+        if previous['time'].astype(str).tolist() != clean_df['time'].astype(str).tolist():
+            return None
+        answers = pd.DataFrame({key: Game.as_text(previous[key]).tolist() for key in ['team', 'event', 'subevent']}, index=clean_df.index, dtype=object)
+        filename_ambiguities = Game.ambiguities_name(filename_out)
+        if os.path.isfile(filename_ambiguities):
+            for index, row in gf.read_csv_as_df(filename_ambiguities).iterrows():
+                answers.at[row['row'], row['field']] = None
+                if row['field'] == 'event':
+                    answers.at[row['row'], 'subevent'] = None
+        return answers.where(answers.notna(), None)
+
+    def vocabulary(column: str) -> list:
+        '''returns the fixed categories of a categorical column in a clean csv, '0' is the empty value
+            teams differ from game to game so they have no fixed vocabulary'''
+        if column == 'event':
+            words = set(Game.events)
+        elif column == 'subevent':
+            words = set().union(*Game.events_and_their_subevents.values())
+        elif column == 'zone':
+            words = set(Game.zones)
+        else:
+            words = set()
+        return sorted(words - {'0'}) + ['0']
+
+    def as_text(values: pd.core.series.Series) -> pd.core.series.Series:
+        '''returns the column as strings, read_csv makes a column of only zeros numeric'''
+        if values.dtype == object:
+            return values
+        text = {x: str(int(x)) if float(x).is_integer() else str(x) for x in values.dropna().unique()}
+        return values.map(text)
+
+    def read_clean_csv(filename: str) -> pd.core.frame.DataFrame:
+        '''returns the clean csv as an event frame, see event_frame'''
+        return Game.event_frame(gf.read_csv_as_df(filename))
+
+    def event_frame(df: pd.core.frame.DataFrame) -> pd.core.frame.DataFrame:
+        '''returns the clean data in df with team, event, subevent and zone as categoricals and sec as the time in seconds
+            the categories are the fixed vocabulary first and then anything else found in the file,
+            so comparisons like df['event'] == 'mål' run on small integer codes instead of strings'''
+        for column in Game.categorical_columns:
+            if column in df.columns:
+                values = Game.as_text(df[column])
+                vocabulary = Game.vocabulary(column)
+                extra = sorted(set(values.dropna().unique()) - set(vocabulary))
+                df[column] = pd.Categorical(values, categories=vocabulary + extra)
+        # unreadable times become -1
+        df['sec'] = gf.readable_to_sec_array(df['time'])
+        return df
+
+    def unify_categories(dfs: list) -> list:
+        '''returns the dfs with the same categories in every categorical column, so that pd.concat keeps them categorical'''
+        dfs = list(dfs)
+        for column in Game.categorical_columns:
+            if not all(column in df.columns and isinstance(df[column].dtype, pd.CategoricalDtype) for df in dfs):
+                continue
+            vocabulary = Game.vocabulary(column)
+            extra = set()
+            for df in dfs:
+                extra.update(df[column].cat.categories)
+            categories = vocabulary + sorted(extra - set(vocabulary))
+            dfs = [df.assign(**{column: df[column].cat.set_categories(categories)}) for df in dfs]
+        return dfs
+
+    def frame_parts(df: pd.core.frame.DataFrame) -> dict:
+        '''returns the event frame df as {column: (values, categories)}, the codes and categories of the categoricals, the values of the rest
+            numpy arrays and short lists that are cheap to send to another process, frame_from_parts makes the frame again'''
+        parts = dict()
+        for column in df.columns:
+            if isinstance(df[column].dtype, pd.CategoricalDtype):
+                parts[column] = (df[column].cat.codes.to_numpy(), df[column].cat.categories.tolist())
+            else:
+                parts[column] = (df[column].tolist() if df[column].dtype == object else df[column].to_numpy(), None)
+        return parts
+
+    def frame_from_parts(parts: dict) -> pd.core.frame.DataFrame:
+        '''returns the event frame of frame_parts'''
+        return pd.DataFrame({column: values if categories is None else pd.Categorical.from_codes(values, categories=categories)
+                             for column, (values, categories) in parts.items()})
+
+    def append_rows(df: pd.core.frame.DataFrame, rows: list) -> pd.core.frame.DataFrame:
+        '''returns the event frame df with rows (dicts with the columns of df, see Stats.append) added at the end
+            the categorical columns are extended by their codes and new words become categories after the old ones,
+            so the old rows are not turned into strings and categorized again like event_frame and pd.concat would'''
+        columns = dict()
+        for column in df.columns:
+            values = [row.get(column) for row in rows]
+            if isinstance(df[column].dtype, pd.CategoricalDtype):
+                values = [value if value is None or isinstance(value, str) else Game.as_text(pd.Series([value])).iloc[0] for value in values]
+                dtype = df[column].dtype
+                new = sorted({value for value in values if isinstance(value, str) and value not in dtype.categories})
+                if len(new) > 0:
+                    dtype = pd.CategoricalDtype(dtype.categories.tolist() + new)
+                columns[column] = pd.Categorical.from_codes(np.append(df[column].cat.codes.to_numpy(), dtype.categories.get_indexer(values)), dtype=dtype)
+            else:
+                old = df[column].to_numpy()
+                if column == 'player' and old.dtype.kind in 'iuf':
+                    # read_csv reads the players as numbers, a player that is not a number is left empty
+                    values = pd.to_numeric(pd.Series(values), errors='coerce').to_numpy()
+                values = np.asarray(values, dtype=object if old.dtype == object else None)
+                columns[column] = np.concatenate([old, values.astype(old.dtype) if np.can_cast(values.dtype, old.dtype, 'same_kind') else values])
+        return pd.DataFrame(columns, index=pd.RangeIndex(len(df) + len(rows)))
     
     
     # non-static methods
@@ -48,126 +209,196 @@ class Game:
         print(f'creating file {filename}')
 
         # variables
-        keys = ['event', 'time']
-        values = [[] for i in range(len(keys))]
         start_time = 0
         inp = ''
 
+        # the log is opened once and every event is appended to it, no rewriting of the whole file
+        log = EventLog(filename)
+        if log.resumed_events > 0:
+            print(f'continuing {log.filename} after {log.resumed_events} events, sync the clock with clock MM:SS')
+
         # input
-        while inp.lower() != 'stop': 
-            inp = input('next event: ')
-            t = time.time()
-            if start_time == 0:
-                start_time = t
-            
-            # we're not interested in double taps on enter!
-            if inp != '':
-                # command for chaning time is 'clock HH:MM:SS'
-                if inp.lower().split()[0] == 'clock':
-                    start_time = Game.set_game_clock(inp.lower().split()[1], t)
-                # event input
-                else:
-                    values[0].append(inp)
-                    values[1].append(gf.sec_to_readable(t-start_time))
-                    gf.save_data_to_csv(filename, keys, values)
-        return 
+        try:
+            while inp.lower() != 'stop':
+                inp = input('next event: ')
+                t = time.time()
+                if start_time == 0:
+                    start_time = t
+
+                # we're not interested in double taps on enter!
+                if inp != '':
+                    # command for chaning time is 'clock HH:MM:SS'
+                    if inp.lower().split()[0] == 'clock':
+                        start_time = Game.set_game_clock(inp.lower().split()[1], t)
+                    # event input
+                    else:
+                        log.append(inp, gf.sec_to_readable(t-start_time))
+        finally:
+            log.close()
+        return
        
-    def clean_csv(self, filename_in: str) -> None:
+    def clean_csv(self, filename_in: str, batch = False, filename_out = None, keep_edited = False) -> int:
         '''cleans raw csv file, creating a more easily worked one
-            asks user when it does not understand, make sure to check if correct 
+            asks user when it does not understand, make sure to check if correct
+            in batch mode we never ask, unresolved rows get 0 and are written to an ambiguity file
+            that can be answered later with resolve_ambiguities. answers from an earlier clean of the same file are reused
+            returns the number of unresolved entries, the csvs are replaced in one step so nobody reads half a file
+            if keep_edited, an earlier clean that doesn't line up with the raw file (fixed by hand) is kept and None is returned
         '''
         # variables 
-        filename_out = gf.append_clean(filename_in)
+        filename_out = gf.append_clean(filename_in) if filename_out is None else filename_out
         event_keys = ['time', 'team', 'event', 'subevent', 'zone', 'player']
-        event_values = [[] for i in range(len(event_keys))]
-
-        df = gf.read_csv_as_df(filename_in)
-        for index, row in df.iterrows():
-            split_set = set(row['event'].lower().split())
-            if 'stop' in split_set:
-                self.set_stop(row['time'], event_values)
-            # del is the 'undo' command
-            elif 'del' not in split_set:
-                # the or operator doesn't work with pandas (| also gives me errors)
-                if 'del' not in set(str(df.iloc[[index + 1]]['event']).lower().split()):
-                    # no 'del' -> POPULATE!
-                    # handle the time
-                    t = row['time']
-                    try:
-                        t.strip()
-                        t = gf.sec_to_readable(gf.readable_to_sec(t))
-                    except:
-                        print(f'error with time conversion on row {index + 1}')
-                    self.set_time(t, event_values)
-                    self.set_team(self.find_team(split_set), event_values)
-                    event = self.find_event(split_set)
-                    self.set_event(event, event_values)
-                    # vad fan är det frågan om?!?!!
-                    self.set_subevent(event, split_set, event_values)
-                    # if we want to answer which zone then change this method
-                    self.set_zone(self.dont_ask_for_zone(split_set), event_values)
-                    self.set_player(self.find_player(split_set), event_values)
-
-        gf.save_data_to_csv(filename_out, event_keys, event_values)
-        return
 
-    def dont_ask_for_zone(self, split_set: set) -> str:
-        '''returns zone if it finds one, else 0'''
-        for zone in Game.zones:
-            if zone in split_set:
-                return zone
-        return '0'
-
-    def set_subevent(self, event: str, split_set: set, event_values: list) -> None:
-        '''finds subevent based on event'''
-        # the event has a subevent
-        if event in Game.events_and_their_subevents:
-            event_values[3].append(self.find_subevent(split_set, event))
-        # the event does not have a subevent
-        else:
-            event_values[3].append('0')
-
-    def set_stop(self, time: str, event_values: list) -> None:
-        '''populates event_values with data that indicates that the game is over'''
-        event_values[0].append(time)
-        event_values[1].append('0')
-        event_values[2].append('stop')
-        event_values[3].append('0')
-        event_values[4].append('0')
-        event_values[5].append('0')
-        return
+        # a crashed collector may have left a truncated last line, it is skipped
+        df = EventLog.read_df(filename_in)
+        clean_df = self.tokenize(df)
+        previous = Game.previous_answers(filename_out, clean_df) if batch else None
+        if keep_edited and previous is None and os.path.isfile(filename_out):
+            return None
+        ambiguities = self.resolve_unknowns(clean_df, batch, previous)
 
-    def set_time(self, time: str, event_values: list) -> None:
-        '''sets time'''
-        event_values[0].append(time)
-        return
+        gf.save_data_to_csv(filename_out, event_keys, [clean_df[key].tolist() for key in event_keys])
+        filename_ambiguities = Game.ambiguities_name(filename_out)
+        if len(ambiguities[0]) > 0:
+            print(f'{len(ambiguities[0])} unresolved entries written to {filename_ambiguities}')
+            gf.save_data_to_csv(filename_ambiguities, Game.ambiguity_keys, ambiguities)
+        elif os.path.isfile(filename_ambiguities):
+            os.remove(filename_ambiguities)
+        return len(ambiguities[0])
 
-    def set_team(self, team: str, event_values: list) -> None:
-        '''sets team'''
-        event_values[1].append(team)
+    def stream_clean(self, records):
+        '''cleans raw [event, time] records one at a time as they come, e.g. from EventLog.tail while collector_raw is still writing
+            yields ('add', row) as soon as a record is read and ('del', row) when a del takes back the row before it,
+            row is the dict from clean_record together with the raw row number. nothing is ever asked, like clean_csv in batch mode,
+            so the rows that are left in the end are the same as the ones a batch clean_csv writes'''
+        previous = None
+        for index, (entry, t) in enumerate(records):
+            tokens = str(entry).lower().split()
+            # del takes back the row before it, unless that was a stop
+            if 'del' in tokens:
+                if previous is not None:
+                    yield 'del', previous
+                previous = None
+                if 'stop' not in tokens:
+                    continue
+            row = self.clean_record(tokens, t, index)
+            row['raw row'] = index
+            previous = row if row['event'] != 'stop' else None
+            yield 'add', row
         return
 
-    def set_event(self, event: str, event_values: list) -> None:
-        '''sets event'''
-        event_values[2].append(event)
-        return
-    
-    # måste ha råkat skriva den här!??!?!
-    # def set_subevent(self, subevent: str, event_values: list) -> None:
-    #     '''sets event'''
-    #     event_values[3].append(subevent)
-    #     return
-
-    def set_zone(self, zone: str, event_values: list) -> None:
-        '''sets zone'''
-        event_values[4].append(zone)
-        return
-    
-    def set_player(self, player: str, event_values: list) -> None:
-        '''sets player'''
-        event_values[5].append(player)
+    def clean_record(self, tokens: list, t: str, index: int) -> dict:
+        '''returns the clean row of one raw record split into lowercase tokens, what tokenize finds for it
+            what the token table can't find becomes 0 just like in batch mode'''
+        if 'stop' in tokens:
+            return {'time': t, 'team': '0', 'event': 'stop', 'subevent': '0', 'zone': '0', 'player': '0'}
+        event = self.lookup(tokens, 'event')
+        subevent = self.lookup(tokens, ('subevent', event)) if event in Game.events_and_their_subevents else '0'
+        row = {'time': self.clean_time(t, index), 'team': self.lookup(tokens, 'team'), 'event': event, 'subevent': subevent,
+               'zone': self.lookup(tokens, 'zone'), 'player': self.lookup(list(reversed(tokens)), 'player')}
+        return {key: '0' if value is None and key != 'time' else value for key, value in row.items()}
+
+    def tokenize(self, df: pd.core.frame.DataFrame) -> pd.core.frame.DataFrame:
+        '''runs the whole raw event column through the token table at once
+            returns a df of the rows that are kept (not undone by del) with what we found,
+            None where nothing was found and the user has to be asked'''
+        tokens = df['event'].astype(str).str.lower().str.split()
+        # one row per token, the index tells us what raw row the token came from
+        exploded = tokens.explode()
+        is_stop = exploded.eq('stop').groupby(level=0).any()
+        is_del = exploded.eq('del').groupby(level=0).any()
+        # del is the 'undo' command, it removes itself and the row before it
+        keep = is_stop | ~(is_del | is_del.shift(-1, fill_value=False))
+
+        # the first token (in typed order) that matches a field wins
+        # except for players where the last one wins, since 'utvisning 10 iks 6' is player 6
+        found = dict()
+        for field in ['team', 'event', 'zone', 'player']:
+            lookup = {token: fields[field] for token, fields in self.token_table.items() if field in fields}
+            matches = exploded.map(lookup).groupby(level=0)
+            found[field] = (matches.last() if field == 'player' else matches.first()).reindex(df.index)
+        event_per_token = found['event'].loc[exploded.index]
+        subevent_lookup = {(field[1], token): value for token, fields in self.token_table.items() for field, value in fields.items() if type(field) == tuple}
+        found['subevent'] = pd.Series(list(zip(event_per_token, exploded)), index=exploded.index).map(subevent_lookup).groupby(level=0).first().reindex(df.index)
+
+        rows = df.index[keep]
+        clean_df = pd.DataFrame({
+            'time': [df.at[i, 'time'] if is_stop[i] else self.clean_time(df.at[i, 'time'], i) for i in rows],
+            'team': ['0' if is_stop[i] else found['team'][i] for i in rows],
+            'event': ['stop' if is_stop[i] else found['event'][i] for i in rows],
+            'subevent': ['0' if is_stop[i] or found['event'][i] not in Game.events_and_their_subevents else found['subevent'][i] for i in rows],
+            'zone': ['0' if is_stop[i] else found['zone'][i] for i in rows],
+            'player': ['0' if is_stop[i] else found['player'][i] for i in rows],
+            'entry': [tokens[i] for i in rows],
+            'raw row': rows
+        })
+        # events without a known event get their subevent after the user has answered
+        clean_df.loc[clean_df['event'].isna(), 'subevent'] = None
+        # zone and player are never asked for
+        clean_df['zone'] = clean_df['zone'].fillna('0')
+        clean_df['player'] = clean_df['player'].fillna('0')
+        return clean_df
+
+    def resolve_unknowns(self, clean_df: pd.core.frame.DataFrame, batch: bool, previous = None) -> list:
+        '''fills in the team, event and subevent that the token table didn't find, row by row in order
+            takes the answer from previous (see previous_answers) if there is one,
+            otherwise asks the user, or in batch mode sets 0 and returns the values for the ambiguity file'''
+        ambiguities = [[] for i in range(len(Game.ambiguity_keys))]
+        unknown = clean_df[['team', 'event', 'subevent']].isna().any(axis=1)
+        for index in clean_df.index[unknown]:
+            split_set = set(clean_df.at[index, 'entry'])
+            for field in ['team', 'event', 'subevent']:
+                if not pd.isna(clean_df.at[index, field]):
+                    continue
+                event = clean_df.at[index, 'event']
+                if field == 'subevent' and event not in Game.events_and_their_subevents:
+                    clean_df.at[index, field] = '0'
+                elif previous is not None and previous.at[index, field] is not None:
+                    clean_df.at[index, field] = previous.at[index, field]
+                elif batch:
+                    clean_df.at[index, field] = '0'
+                    for i, value in enumerate([index, field, ' '.join(clean_df.at[index, 'entry']), clean_df.at[index, 'time']]):
+                        ambiguities[i].append(value)
+                elif field == 'team':
+                    clean_df.at[index, field] = self.ask_for_team(split_set)
+                elif field == 'event':
+                    clean_df.at[index, field] = self.ask_for_event(split_set)
+                else:
+                    clean_df.at[index, field] = self.find_subevent(clean_df.at[index, 'entry'], event)
+        return ambiguities
+
+    def resolve_ambiguities(self, filename_in: str, filename_out = None) -> None:
+        '''asks the questions that a batch clean_csv of filename_in left in its ambiguity file
+            and writes the answers into the clean csv'''
+        filename_out = gf.append_clean(filename_in) if filename_out is None else filename_out
+        filename_ambiguities = Game.ambiguities_name(filename_out)
+        if not os.path.isfile(filename_ambiguities):
+            return
+        clean_df = gf.read_csv_as_df(filename_out)
+        for index, row in gf.read_csv_as_df(filename_ambiguities).iterrows():
+            tokens = str(row['entry']).split()
+            if row['field'] == 'team':
+                clean_df.at[row['row'], 'team'] = self.ask_for_team(set(tokens))
+            elif row['field'] == 'event':
+                event = self.ask_for_event(set(tokens))
+                clean_df.at[row['row'], 'event'] = event
+                if event in Game.events_and_their_subevents:
+                    clean_df.at[row['row'], 'subevent'] = self.find_subevent(tokens, event)
+            elif clean_df.at[row['row'], 'event'] in Game.events_and_their_subevents:
+                clean_df.at[row['row'], 'subevent'] = self.ask_for_subevent(set(tokens), clean_df.at[row['row'], 'event'])
+        gf.replace_csv(clean_df, filename_out)
+        os.remove(filename_ambiguities)
         return
 
+    def clean_time(self, t: str, index: int) -> str:
+        '''returns the raw time as H:MM:SS, prints an error and keeps it as is if that fails'''
+        try:
+            t.strip()
+            t = gf.sec_to_readable(gf.readable_to_sec(t))
+        except:
+            print(f'error with time conversion on row {index + 1}')
+        return t
+
     def ask_for_team(self, entry: set) -> str:
         '''asks the user to specify which team it is'''
         inp = ''
@@ -198,38 +429,53 @@ class Game:
                 return inp
             
 
-    def find_team(self, split_set: set) -> str:
+    def find_team(self, tokens: list) -> str:
         '''attempts to find team, if not successful asks user to do it manually'''
-        for team in self.teams:
-            if team in split_set:
-                return team
-        return self.ask_for_team(split_set)
+        team = self.lookup(tokens, 'team')
+        return team if team != None else self.ask_for_team(set(tokens))
     
-    def find_event(self, split_set: set) -> str:
+    def find_event(self, tokens: list) -> str:
         '''attempts to find event, if not successful asks user to do it manually'''
-        for event in Game.events:
-            if event in split_set:
-                return event
-        return self.ask_for_event(split_set)
+        event = self.lookup(tokens, 'event')
+        return event if event != None else self.ask_for_event(set(tokens))
     
-    def find_subevent(self, split_set: set, event: str) -> str:
+    def find_subevent(self, tokens: list, event: str) -> str:
         '''attempts to find subevent for known event, if not successful asks user to do it manually'''
-        for subevent in Game.events_and_their_subevents[event]:
-            if subevent in split_set:
-                return subevent
-        return self.ask_for_subevent(split_set, event)
+        subevent = self.lookup(tokens, ('subevent', event))
+        return subevent if subevent != None else self.ask_for_subevent(set(tokens), event)
 
-    def find_zone(self, split_set: set) -> str:
+    def find_zone(self, tokens: list) -> str:
         '''attempts to find zone, if not successful asks user to do it manually'''
-        for zone in Game.zones:
-            if zone in split_set:
-                return zone
-        return self.ask_for_zone(split_set)
+        zone = self.lookup(tokens, 'zone')
+        return zone if zone != None else self.ask_for_zone(set(tokens))
     
-    def find_player(self, split_set: set) -> str:
-        ''''attempts to find player, if not successful returns 0'''
-        for word in split_set:
-            if word in Game.players:
-                return word
-        return '0'
+    def find_player(self, tokens: list) -> str:
+        ''''attempts to find player, if not successful returns 0
+            the last number is the player, an earlier one may be the length of a penalty'''
+        player = self.lookup(list(reversed(tokens)), 'player')
+        return player if player != None else '0'
+
+    def lookup(self, tokens: list, field) -> str:
+        '''returns the value of the first token that matches field in the token table, None if none does'''
+        for token in tokens:
+            if token in self.token_table and field in self.token_table[token]:
+                return self.token_table[token][field]
+        return None
+
 
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description='cleans raw csv files from Game.collector_raw, run from the raw folder')
+    parser.add_argument('files', nargs='+', help='raw csv files (with or without .csv)')
+    parser.add_argument('--teams', nargs='+', required=True, help='the team abbreviations used in the files, e.g. iks rät')
+    parser.add_argument('--batch', action='store_true', help='never ask, write unresolved rows to an ambiguity file next to the clean csv')
+    parser.add_argument('--resolve', action='store_true', help='answer the questions left in the ambiguity files of a previous --batch run')
+    args = parser.parse_args()
+
+    g = Game(set(args.teams))
+    for filename in args.files:
+        print(filename)
+        if args.resolve:
+            g.resolve_ambiguities(filename)
+        else:
+            g.clean_csv(filename, batch = args.batch)
@@ -259,8 +259,8 @@ class Plot:
     main_team_color = 'k', other_team_color = 'r') -> str:
         '''makes a time plot with vertical bars, will mostly be used for parts of game stats 
             returns link to image'''
-        main_team_values = [gf.readable_to_sec(x[self.stats.main_team]) for x in values]
-        other_team_values = [gf.readable_to_sec(x[self.stats.opposite_team(self.stats.main_team)]) for x in values]
+        main_team_values = [x[self.stats.main_team] for x in values]
+        other_team_values = [x[self.stats.opposite_team(self.stats.main_team)] for x in values]
         width = 0.25
         x = np.arange(len(values))
         x_labels = [f'{i+1}/{len(values)}' for i in range(len(values))]
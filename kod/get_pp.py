@@ -332,7 +332,7 @@ class PP:
         res.level = 0 
     
         res = bp2.text_frame.add_paragraph()
-        res.text = f"Bollinnehav för/emot: \n\t{gf.sec_to_readable(gf.readable_to_sec(self.other.prints['possession'][self.other.main_team]) // self.other.number_of_games)} / {gf.sec_to_readable(gf.readable_to_sec(self.other.prints['possession'][self.other.opposite_team(self.other.main_team)]) // self.other.number_of_games)}"
+        res.text = f"Bollinnehav för/emot: \n\t{gf.sec_to_readable(self.other.prints['possession'][self.other.main_team] // self.other.number_of_games)} / {gf.sec_to_readable(self.other.prints['possession'][self.other.opposite_team(self.other.main_team)] // self.other.number_of_games)}"
         res.level = 0 
 
 
@@ -365,7 +365,7 @@ class PP:
         res.level = 0 
     
         res = bp2.text_frame.add_paragraph()
-        res.text = f"Bollinnehav för/emot: \n\t{self.stats.prints['possession'][self.stats.main_team]} / {self.stats.prints['possession'][self.stats.opposite_team(self.stats.main_team)]}"
+        res.text = f"Bollinnehav för/emot: \n\t{gf.sec_to_readable(self.stats.prints['possession'][self.stats.main_team])} / {gf.sec_to_readable(self.stats.prints['possession'][self.stats.opposite_team(self.stats.main_team)])}"
         res.level = 0 
 
 
@@ -526,7 +526,7 @@ class PP:
             res.level = 0
             res.font.color.rgb = self.get_team_text_color(team) 
             res = bp2.text_frame.add_paragraph()
-            res.text = f"Bollinnehav: \n\t{self.stats.prints['possession'][team]} - {round(gf.readable_to_sec(self.stats.prints['possession'][team])/(gf.readable_to_sec(self.stats.prints['possession'][team]) + gf.readable_to_sec(self.stats.prints['possession'][self.stats.opposite_team(team)]))* 100)} %"
+            res.text = f"Bollinnehav: \n\t{gf.sec_to_readable(self.stats.prints['possession'][team])} - {round(self.stats.prints['possession'][team]/(self.stats.prints['possession'][team] + self.stats.prints['possession'][self.stats.opposite_team(team)])* 100)} %"
             res.level = 0
             res.font.color.rgb = self.get_team_text_color(team) 
             #res = bp2.text_frame.add_paragraph() # orkar inte göra turnary för noll
@@ -993,7 +993,7 @@ class PP:
             res.level = 0
             res.font.color.rgb = self.get_team_text_color(team)
             res = bp2.text_frame.add_paragraph()
-            res.text = f"Bollinnehav: \n\t{self.stats.prints['possession'][team]} ({round(gf.readable_to_sec(self.stats.prints['possession'][team])/(gf.readable_to_sec(self.stats.prints['possession'][team]) + gf.readable_to_sec(self.stats.prints['possession'][self.stats.opposite_team(team)]))* 100)} %)"
+            res.text = f"Bollinnehav: \n\t{gf.sec_to_readable(self.stats.prints['possession'][team])} ({round(self.stats.prints['possession'][team]/(self.stats.prints['possession'][team] + self.stats.prints['possession'][self.stats.opposite_team(team)])* 100)} %)"
             res.level = 0
             res.font.color.rgb = self.get_team_text_color(team) 
 
@@ -1127,7 +1127,7 @@ class PP:
         for goal in self.stats.goals_info_list:
             res = bp1.text_frame.add_paragraph()
             # fixa det här med målens tid i andra halvlek
-            res.text = f"{goal['time']}: {goal['origin']} -> {goal['shot type']} på {goal['attack time']}s."
+            res.text = f"{gf.sec_to_readable(goal['time'])}: {goal['origin']} -> {goal['shot type']} på {goal['attack time']}s."
             res.font.color.rgb = self.get_team_text_color(goal['team']) 
             res.level = 0
 
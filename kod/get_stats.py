@@ -2,7 +2,15 @@ import pandas as pd
 from get_data import Game
 import general_functions as gf
 import constants
-from bisect import bisect_left
+from possession_timeline import PossessionTimeline
+from time_buckets import TimeBuckets
+from lazy_prints import LazyPrints
+from event_index import EventIndex
+from count_cube import CountCube
+from stats_accumulator import StatsAccumulator
+from concurrent.futures import ProcessPoolExecutor
+import os
+import hashlib
 import numpy as np
 
 
@@ -17,34 +25,82 @@ class Stats:
     start_of_play = {'avslag', 'frislag', 'inslag', 'utkast', 'skott', 'hörna', 'straff', 'boll'} # varför hade jag inte boll? för att den kommer med för ofta????
     # used for zone specific data, coverts zones 180 degrees
     zone_change = {'z1':'z9', 'z2':'z8', 'z3': 'z7', 'z4':'z6', 'z5':'z5', 'z6':'z4', 'z7':'z3', 'z8':'z2', 'z9':'z1', '0': '0'}
+    # used for finding which way the teams attack
+    attack_direction = {'z7': 'up', 'z8': 'up', 'z9': 'up', 'z1': 'down', 'z2': 'down', 'z3': 'down'}
     # used for corners
     corner_sides = {'right': ['z1', 'z9'], 'left': ['z3', 'z7']}
     corner_zone_to_name = {'z1': 'right', 'z9': 'right', 'z3': 'left', 'z7': 'left'}
     # used for possession after shot
     positive_events = {'mål', 'hörna', 'straff'}
+    # the sections of prints and the methods that fill them, see LazyPrints
+    sections = {'score': 'get_score_dict', 'possession': 'get_possession_dict', 'duels': 'get_duels_dict', 'shot types': 'get_shottypes_dict',
+                'shot origins': 'get_shot_origins_dict', 'interceptions': 'get_interceptions_dict', 'lost balls': 'get_lost_balls_dict',
+                'scrimmages': 'get_scrimmages_dict', 'shots on goal': 'get_sog_dict', 'before and after': 'get_before_and_after_dict',
+                'duel zones': 'get_duel_zones_dict', 'freeshot zones': 'get_freeshot_zones_dict', 'per time lists': 'make_per_time_lists',
+                '40': 'make_40_list', 'sustained attacks': 'make_sustained_attacks', 'corners': 'get_corners_dict',
+                'corner goal sides': 'get_corner_goal_sides', 'slot passes': 'get_slot_passes_dict', 'long passes': 'get_long_passes_dict',
+                'penalties': 'get_penalties_dict', 'goal types': 'get_goal_types', 'expected goals': 'get_expected_goals',
+                'penalty shots': 'get_penalty_shots_dict', 'expected goals list': 'get_expected_goals_lists', 'goals lists': 'get_goals_lists',
+                'duel zones per team': 'get_duel_zones_per_team', 'duel winners per zone and team': 'get_duel_winners_per_zone_and_team'}
+    # the sections that are lookups into the count cube, adding Stats adds the cubes and reads these again
+    cube_sections = ['score', 'duels', 'interceptions', 'lost balls', 'scrimmages', 'shots on goal', 'duel zones', 'freeshot zones',
+                     'corners', 'slot passes', 'long passes', 'penalties', 'penalty shots', 'shot types']
+    # the source files whose code decides what a Stats object holds, a snapshot made by another version of them is made again
+    code_files = ['get_stats.py', 'get_data.py', 'general_functions.py', 'constants.py', 'stats_accumulator.py', 'count_cube.py',
+                  'possession_timeline.py', 'time_buckets.py', 'event_index.py', 'lazy_prints.py']
+    # attributes that are made the first time they are read, and the methods that make them
+    lazy_attributes = {'goal_origins_list': 'get_goal_origins_list', 'goals_info_list': 'get_goals_info_list'}
+    # the events and subevents that change each section when they are appended, see append
+    section_events = {'score': {'mål'}, 'duels': {'närkamp', 'brytning'}, 'shot types': {'skottyp'}, 'shot origins': {'skott', 'mål'},
+                      'interceptions': {'brytning'}, 'lost balls': {'bolltapp'}, 'scrimmages': {'närkamp'}, 'shots on goal': {'mål', 'räddning'},
+                      'before and after': {'närkamp', 'brytning'}, 'duel zones': {'närkamp', 'brytning'}, 'freeshot zones': {'frislag'},
+                      'corners': {'hörna'}, 'corner goal sides': {'mål'}, 'slot passes': {'straffområde'}, 'long passes': {'lång', 'farlig'},
+                      'penalties': {'utvisning'}, 'goal types': {'mål'}, 'expected goals': {'skottyp', 'straff'}, 'penalty shots': {'straff'},
+                      'expected goals list': {'skottyp'}, 'goals lists': {'skottyp'}, 'duel zones per team': {'närkamp', 'brytning'},
+                      'duel winners per zone and team': {'närkamp', 'brytning'}}
+    # the sections that change with every appended event, the half gets longer
+    time_sections = ['per time lists', 'possession', '40']
+    # the sections that change when the ball changes hands, a duel at the same second gets another possession before
+    # and the sustained attacks only depend on the possession list
+    possession_sections = ['before and after', 'duel zones per team', 'duel winners per zone and team', 'sustained attacks']
 # constructor
-    def __init__(self, filename: str, dummy = False, main_team = 'iks', N = 3) -> None:
-        '''makes and calculates the Stats object. 
+    def __init__(self, filename: str, dummy = False, main_team = 'iks', N = 3, big_df = None, zones_flipped = None) -> None:
+        '''makes the Stats object, the sections of prints are calculated the first time they are read (compile_stats calculates all of them)
         main_team is which team we highlight. N is how many parts the half is divided into for the per-part stats.
-        Dummy is only used when we are creating a custom object for example by dunder add'''
-        self.prints = dict()
+        Dummy is only used when we are creating a custom object for example by dunder add.
+        big_df is for events that are already loaded (e.g. from the event warehouse), then filename is only a name.
+        zones_flipped is for a big_df whose zones are already turned the right way (e.g. the big_df of another Stats object), then flip_zones is not run'''
+        self.prints = LazyPrints(self, Stats.sections)
         self.possession_list = list()
-        self.goal_origins_list = list()
+        # what run_event_engine finds in its pass over the events
+        self.engine = dict()
+        # (N, width) -> TimeBuckets of big_df, see get_time_buckets
+        self.time_buckets = dict()
+        # tables made from the events, like the shot origins and the player table (a dummy can be given a big_df later)
+        self.df_dict = dict()
+        # the StatsAccumulator a sum or a snapshot was filled from, its player table is made when it is first asked for
+        self.accumulator = None
         self.main_team = main_team
         self.out = filename
         # mainly used for number of halves  
         self.number_of_games = 1
         # number of parts the game will be split into
         self.N = N
+        # whether the zones were turned to make main_team score in z8, appended events are turned the same way
+        self.zones_flipped = False
         # dummy is only used when creating a custom object such as when adding two ojects  
         if not dummy: 
-            self.big_df = gf.read_csv_as_df(filename)
+            self.big_df = Game.read_clean_csv(filename) if big_df is None else big_df
             self.teams = {team for team in self.big_df['team'].tolist() if team != '0'}
             # ensures that main_team always scores in z8
-            self.flip_zones()
-
-            self.df_dict = dict()
-            self.compile_stats()
+            if zones_flipped is None:
+                self.flip_zones()
+            else:
+                self.zones_flipped = zones_flipped
+            # the row positions of every event and subevent, see get_events_df
+            self.event_index = EventIndex(self.big_df)
+            # the number of events per team, event, subevent and zone, what the counting sections are read from
+            self.count_cube = CountCube(self.big_df, list(self.teams))
         return
 
 # static methods
@@ -59,181 +115,277 @@ class Stats:
         return Stats.corner_zone_to_name[zone]
 
 
-# dunder add, for Stats() + Stats()
+# dunder getattr, makes the lazy attributes when they are first read, and big_df and event_index again after events were appended
+    def __getattr__(self, name: str):
+        if name in ('big_df', 'event_index') and 'appended' in self.__dict__:
+            df, rows = self.__dict__.pop('appended')
+            self.big_df = Game.append_rows(df, rows)
+            self.event_index = EventIndex(self.big_df)
+            return self.__dict__[name]
+        if name not in Stats.lazy_attributes or 'prints' not in self.__dict__:
+            raise AttributeError(name)
+        setattr(self, name, getattr(self, Stats.lazy_attributes[name])())
+        return self.__dict__[name]
+
+# dunder add, for Stats() + Stats(), and sum() of a list of Stats (use Stats.combine for many)
     def __add__(self, other) -> None:
         if not isinstance(other, Stats):
             return NotImplemented
-        # new empty object
-        obj = Stats(str(), dummy = True, main_team = self.main_team)
-        obj.possession_list = self.possession_list + other.possession_list
-        obj.goal_origins_list = self.goal_origins_list + other.goal_origins_list
-        obj.goals_info_list = self.goals_info_list + other.goals_info_list
-        obj.out = f'{self.out} och {other.out}'
-        obj.teams = self.teams
-        obj.number_of_games = self.number_of_games + other.number_of_games
-        
-        obj.prints['score'] = self.add_score(other)
-        obj.prints['possession'] = self.add_possession(other)
-        obj.prints['duels'] = self.add_duels(other)
-        obj.prints['shot types'] = self.add_shottypes(other)
-        obj.prints['shot origins'] = self.add_shot_origins(other)
-        obj.prints['interceptions'] = self.add_interceptions(other)
-        obj.prints['lost balls'] = self.add_lost_balls(other)
-        obj.prints['scrimmages'] = self.add_scrimmages(other)
-        obj.prints['before and after'] = self.add_before_and_after(other)
-        obj.prints['shots on goal'] = self.add_sog(other)
-        obj.prints['duel zones'] = self.add_duel_zones(other)
-        obj.prints['freeshot zones'] = self.add_freeshot_zones(other)
-        obj.prints['per time lists'] = self.add_per_time_lists(other)
-        obj.prints['40'] = self.add_40_list(other)
-        obj.prints['sustained attacks'] = self.add_sustained_attacks(other)
-        obj.prints['corners'] = self.add_corners(other)
-        obj.prints['corner goal sides'] = self.add_corner_goal_sides(other)
-        obj.prints['slot passes'] = self.add_slot_passes(other)
-        obj.prints['long passes'] = self.add_long_passes(other)
-        obj.prints['penalties'] = self.add_penalties(other)
-        obj.prints['goal types'] = self.add_goal_types(other)
-        obj.prints['expected goals'] = self.add_expected_goals(other)
-        obj.prints['expected goals list'] = self.add_expected_goals_lists(other)
-        obj.prints['goals lists'] = self.add_goals_list(other)
-        obj.prints['penalty shots'] = self.add_penalty_shots(other)
-        obj.prints['duel zones per team'] = self.add_duel_zones_per_team(other)
-        obj.prints['duel winners per zone and team'] = self.add_duel_winners_per_zone_and_team(other)
-        
-        return obj
+        return Stats.combine([self, other])
+
+    def __radd__(self, other) -> None:
+        if isinstance(other, int) and other == 0:
+            return self
+        return NotImplemented
+
+# static methods that combine Stats objects
+    def combine(stats_list: list):
+        '''returns one Stats object of all the objects in stats_list, like adding them but merged in one go'''
+        merged = StatsAccumulator.merge([StatsAccumulator(stats) for stats in stats_list])
+        return merged.fill(Stats(str(), dummy = True, main_team = stats_list[0].main_team))
+
+    def accumulate_files(filenames: list, main_team = 'iks', players = False) -> StatsAccumulator:
+        '''returns the merged accumulator of the halves in filenames, the work of one process in combine_files
+            the halves are not kept, so their player tables are made here if players'''
+        accumulator = StatsAccumulator.merge([StatsAccumulator(Stats(filename, main_team = main_team)) for filename in filenames])
+        accumulator.release(players)
+        return accumulator
+
+    def combine_files(filenames: list, main_team = 'iks', workers = None, players = False):
+        '''returns one Stats object of the halves in filenames, in that order
+            the files are split over a process pool, each process merges its share and the shares are merged at the end.
+            the player table (see get_player_table) is only summed if players, it costs a groupby per half'''
+        workers = min(len(filenames), workers or os.cpu_count() or 1)
+        if workers <= 1:
+            accumulator = Stats.accumulate_files(filenames, main_team, players)
+        else:
+            size = -(-len(filenames) // workers)
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                shares = list(pool.map(Stats.accumulate_files, [filenames[i:i + size] for i in range(0, len(filenames), size)], [main_team] * workers, [players] * workers))
+            accumulator = StatsAccumulator.merge(shares)
+        return accumulator.fill(Stats(str(), dummy = True, main_team = main_team))
+
+    def code_version() -> str:
+        '''returns the sha1 of the source files that decide what a Stats object holds, see code_files'''
+        folder = os.path.dirname(os.path.abspath(__file__))
+        return hashlib.sha1(''.join(gf.file_hash(os.path.join(folder, name)) for name in Stats.code_files).encode('utf-8')).hexdigest()
+
+    def snapshot_header(filename: str, main_team: str, N: int) -> dict:
+        '''returns what the snapshot of filename has to match to be used, the csv content and the stats code it was made by'''
+        return {'source': gf.file_hash(gf.csv_path(filename)), 'code': Stats.code_version(), 'main team': main_team, 'N': N}
+
+    def load_snapshot(filename: str, main_team = 'iks', N = 3):
+        '''returns the Stats object of filename read from its snapshot, or None if there is none or the csv or the code has changed since it was saved
+            the object has the prints, the lists and the count cube but no big_df, like a sum of halves'''
+        if not os.path.isfile(gf.csv_path(filename)):
+            return None
+        accumulator, header = StatsAccumulator.load(gf.snapshot_name(gf.csv_path(filename), main_team, N))
+        if accumulator is None or header != Stats.snapshot_header(filename, main_team, N):
+            return None
+        return accumulator.fill(Stats(filename, dummy = True, main_team = main_team, N = N))
+
+    def load(filename: str, main_team = 'iks', N = 3):
+        '''returns the Stats object of filename, from its snapshot if it is up to date, else it is made from the csv and saved as a snapshot'''
+        stats = Stats.load_snapshot(filename, main_team, N)
+        if stats is None:
+            stats = Stats(filename, main_team = main_team, N = N)
+            stats.save_snapshot()
+        return stats
 
 # non-static methods
+    def save_snapshot(self) -> bool:
+        '''saves every section, the lists and the count cube as the snapshot of the csv of the object (self.out), see load_snapshot
+            returns False if it was not saved, e.g. for an object that was not read from a csv'''
+        if not os.path.isfile(gf.csv_path(self.out)):
+            return False
+        return StatsAccumulator(self).save(gf.snapshot_name(gf.csv_path(self.out), self.main_team, self.N), Stats.snapshot_header(self.out, self.main_team, self.N))
+
     def compile_stats(self) -> None:
-        '''calls all methods needed to compile all the stats'''
-        self.get_score_dict()
-        self.get_possession_dict()
-        self.get_duels_dict()
-        self.get_shottypes_dict()
-        self.get_shot_origins_dict()
-        self.get_interceptions_dict()
-        self.get_lost_balls_dict()
-        self.get_scrimmages_dict()
-        self.get_sog_dict()
-        self.get_before_and_after_dict()
-        self.get_duel_zones_dict()
-        self.get_freeshot_zones_dict()
-        self.make_per_time_lists()
-        self.make_40_list()
-        self.make_sustained_attacks()
-        self.get_corners_dict()
-        self.get_corner_goal_sides()
-        self.get_slot_passes_dict()
-        self.get_long_passes_dict()
-        self.get_penalties_dict()
-        self.get_goal_types()
-        self.get_expected_goals()
-        self.get_penalty_shots_dict()
-        self.get_expected_goals_lists()
-        self.get_goals_lists()
-        self.get_duel_zones_per_team()
-        self.get_duel_winners_per_zone_and_team()
-
-        # gör något åt detta, det ser förjävligt ut 
-        self.goal_origins_list = self.get_goal_origins_list()
-        self.goals_info_list = self.get_goals_info_list()
+        '''calculates every section of prints and the lazy attributes now instead of when they are first read'''
+        for section in Stats.sections:
+            self.prints[section]
+        for name in Stats.lazy_attributes:
+            getattr(self, name)
+        return
+
+    def append(self, row: dict) -> bool:
+        '''adds one event at the end of the half, row is a clean row like those of LiveGame (a dict with time, team, event, subevent, zone and player)
+            the event engine takes one step and the count cube counts one more event, both without going over the half again,
+            and only the sections the event can change are dropped from prints (see section_events), they are made again when read.
+            big_df is made again when something reads it (see __getattr__), once for all the events appended since.
+            the time buckets count the event in place (see TimeBuckets.add), so the time sections are made again without big_df.
+            the zones are turned like the rest of the half, the direction found when the object was made is kept.
+            returns False if the event can't be appended, for a dummy or a team that has not played in the half, then the object has to be made again'''
+        if 'big_df' in self.__dict__:
+            self.appended = (self.__dict__.pop('big_df'), list())
+            self.__dict__.pop('event_index', None)
+        elif 'appended' not in self.__dict__:
+            return False
+        if row['team'] not in self.teams and str(row['team']) != '0':
+            return False
+        self.run_event_engine()
+        row = dict(row)
+        if self.zones_flipped and row['zone'] in Stats.zone_change:
+            row['zone'] = Stats.zone_change[row['zone']]
+        row['sec'] = gf.readable_time_to_sec(row['time'])
+        self.appended[1].append(row)
+        self.count_cube.add(tuple(row[axis] for axis in CountCube.axes))
+        goal_waiting = self.engine['state']['goal']
+        changes = len(self.engine['possession list'])
+        self.engine_step(row['event'], row['team'], row['subevent'], row['zone'], row['sec'])
+
+        # what is made from big_df or the engine is made again when read
+        dropped = list(Stats.time_sections)
+        dropped += [section for section, words in Stats.section_events.items() if row['event'] in words or row['subevent'] in words]
+        if goal_waiting:
+            dropped.append('goal types')
+        if len(self.engine['possession list']) > changes:
+            dropped += Stats.possession_sections
+            self.engine.pop('possession timeline', None)
+            if len(self.possession_list) > 0:
+                self.possession_list.extend(self.engine['possession list'][len(self.possession_list):])
+        for section in dropped:
+            self.prints.invalidate(section)
+        if goal_waiting or row['event'] == 'mål':
+            for name in Stats.lazy_attributes:
+                self.__dict__.pop(name, None)
+        # the counts per time bucket are kept up to date, the half now ends at the new event
+        for buckets in self.time_buckets.values():
+            buckets.add(row['sec'], row['team'], row['event'])
+        self.df_dict = dict()
+        return True
 
     def team_attacks_up(self, team: str) -> bool:
         '''does team score in z8? 
             None if team does not play'''
         if team not in self.teams:
             return None
-        attacking_zone = {t: {'up': 0, 'down': 0} for t in self.teams}
-        up = {'z7', 'z8', 'z9'}
-        down = {'z1', 'z2', 'z3'}
-        events = self.big_df.loc[self.big_df['event'].isin(['hörna', 'mål', 'skott'])]
-        for index, row in events.iterrows():
-            if row['zone'] in up:
-                attacking_zone[row['team']]['up'] += 1
-            elif row['zone'] in down:
-                attacking_zone[row['team']]['down'] += 1
-        # does team attack up and opposite down?
-        return max(attacking_zone[team], key=attacking_zone[team].get) == 'up' and max(attacking_zone[self.opposite_team(team)], key=attacking_zone[self.opposite_team(team)].get) == 'down'
+        events = self.big_df.loc[self.big_df['event'].isin(['hörna', 'mål', 'skott']), ['team', 'zone']]
+        # team x {up, down}, teams without a shot in either end get zeros
+        direction = events['zone'].astype(object).map(Stats.attack_direction)
+        attacking_zone = pd.crosstab(events['team'].astype(object), direction).reindex(index=list(self.teams), columns=['up', 'down'], fill_value=0)
+        # does team attack up and opposite down? a draw counts as up, like max over {'up', 'down'} did
+        opposite = self.opposite_team(team)
+        return attacking_zone.at[team, 'up'] >= attacking_zone.at[team, 'down'] and attacking_zone.at[opposite, 'down'] > attacking_zone.at[opposite, 'up']
     
+    def has_players(self) -> bool:
+        '''returns True if get_player_table has a table to give, without making it'''
+        if 'players' in self.df_dict:
+            return True
+        df = getattr(self, 'big_df', None)
+        if df is not None:
+            return 'player' in df.columns
+        return self.accumulator is not None and self.accumulator.has_players()
+
     def get_player_stats_dict(self, player: str) -> dict:
-        '''calculates a dictionary of the player in question's stats'''
-        player_df = self.big_df.loc[self.big_df['player'] == int(player)]
-        stats_dict = dict()
-        stats_dict['mål'] = len(player_df.loc[player_df['event'] == 'mål'])
-        stats_dict['skott'] = len(player_df.loc[player_df['event'] == 'skottyp'])
-        stats_dict['målformer'] = player_df.loc[player_df['event'] == 'mål', 'subevent'].value_counts().to_dict()
-        stats_dict['skottyp'] = player_df.loc[player_df['event'] == 'skottyp', 'subevent'].value_counts().to_dict()
-        stats_dict['passning'] = player_df.loc[player_df['event'] == 'passning', 'subevent'].value_counts().to_dict()
-        stats_dict['hörna'] = len(player_df.loc[player_df['event'] == 'hörna'])
-
-        # skottyper för varje mål
-        goal_indices = player_df[player_df['event'] == 'mål'].index
-        next_indices = goal_indices + 1
-        stats_dict['målskottyper'] = player_df.loc[next_indices, 'subevent'].value_counts().to_dict()
-
-        stats_dict['xg'] = sum([constants.expected_goals[st] * stats_dict['skottyp'][st] for st in stats_dict['skottyp']])
+        '''calculates a dictionary of the player in question's stats, read from the player table'''
+        table = self.get_player_table()
+        row = table.loc[int(player)] if int(player) in table.index else pd.Series(0, index=table.columns)
+        stats_dict = {metric: int(row[(metric, '')]) for metric in ['mål', 'skott', 'hörna']}
+        for metric in ['målformer', 'skottyp', 'passning', 'målskottyper']:
+            counts = row[metric] if metric in table.columns.get_level_values(0) else pd.Series(dtype=int)
+            stats_dict[metric] = {key: int(n) for key, n in counts.items() if n > 0}
+        stats_dict['xg'] = float(row[('xg', '')])
         return stats_dict
 
+    def get_player_table(self) -> pd.core.frame.DataFrame:
+        '''returns a table with a row per player and a column per (metric, subevent), made with one groupby over the events of all players
+            metrics counted per subevent are målformer (goals), skottyp (shot types), passning and målskottyper (the shot type of each goal),
+            mål, skott, hörna and xg have the subevent ''. the shot type of a goal is the skottyp row right after it
+            a snapshot or a sum of halves has the table of the halves it was saved or summed from, see StatsAccumulator.player_table
+            populates the df_dict if not already done'''
+        if 'players' not in self.df_dict:
+            df = getattr(self, 'big_df', None)
+            if df is None and self.accumulator is not None and self.accumulator.has_players():
+                self.df_dict['players'] = self.accumulator.player_table()
+                return self.df_dict['players']
+            if df is None or 'player' not in df.columns:
+                reason = 'its events have no player column' if df is not None else 'it has no events and none of its halves had a player column (or combine_files was not given players = True)'
+                raise ValueError(f'no player stats for {self.out}, {reason}')
+            event = df['event'].astype(object).to_numpy()
+            subevent = df['subevent'].astype(object).to_numpy()
+            player = df['player'].to_numpy()
+            # the goals whose next row is their skottyp row
+            goals = np.flatnonzero(event == 'mål')
+            goals = goals[(goals + 1 < len(df))]
+            goals = goals[event[goals + 1] == 'skottyp']
+            parts = [(event == 'mål', 'mål', None), (event == 'mål', 'målformer', subevent), (event == 'skottyp', 'skott', None),
+                     (event == 'skottyp', 'skottyp', subevent), (event == 'passning', 'passning', subevent), (event == 'hörna', 'hörna', None)]
+            rows = pd.concat([pd.DataFrame({'player': player[mask], 'metric': metric, 'subevent': '' if keys is None else keys[mask]}) for mask, metric, keys in parts]
+                             + [pd.DataFrame({'player': player[goals], 'metric': 'målskottyper', 'subevent': subevent[goals + 1]})])
+            table = rows.groupby(['player', 'metric', 'subevent']).size().unstack(['metric', 'subevent'], fill_value=0)
+            for metric in ['mål', 'skott', 'hörna']:
+                if (metric, '') not in table.columns:
+                    table[(metric, '')] = 0
+            # shot types without an expected goals value (like '0') count as 0
+            shot_types = [column for column in table.columns if column[0] == 'skottyp']
+            table[('xg', '')] = sum([constants.expected_goals.get(column[1], 0) * table[column] for column in shot_types], pd.Series(0.0, index=table.index))
+            self.df_dict['players'] = table.sort_index(axis=1)
+        return self.df_dict['players']
+
     
     def flip_zones(self) -> None:
-        '''ensures that main_team scores into z8, if not calls other_direction on all zones so it does'''
+        '''ensures that main_team scores into z8, if not calls other_direction on all zones so it does
+            rows without a real zone are left as they are and reported together'''
         if not self.team_attacks_up(self.main_team):
-            for index, row in self.big_df.iterrows():
-                try:
-                    self.big_df.at[index, 'zone'] = Stats.other_direction(self.big_df.at[index, 'zone'])
-                except:
-                    print(f'fel på rad {index}, \n{row}')
+            zone = self.big_df['zone'].astype(object)
+            bad = ~zone.isin(Stats.zone_change.keys())
+            if bad.any():
+                print(f'fel zon på rad {", ".join(str(index) for index in self.big_df.index[bad])}')
+            self.big_df['zone'] = zone.where(bad, zone.map(Stats.zone_change)).astype(self.big_df['zone'].dtype)
+            self.zones_flipped = True
+        return
     
     def make_per_time_lists(self) -> None:
         '''populates the prints["per time lists"]'''
+        buckets = self.get_time_buckets(N = self.N)
         self.prints['per time lists'] = dict()
-        self.prints['per time lists']['duels'] = self.get_per_time_list(self.get_duels_df())
-        self.prints['per time lists']['shots'] = self.get_per_time_list(self.get_shots_df())
-        self.prints['per time lists']['goals'] = self.get_per_time_list(self.get_score_df())
+        self.prints['per time lists']['duels'] = buckets.per_bucket(['närkamp', 'brytning'])
+        self.prints['per time lists']['shots'] = buckets.per_bucket(['skott', 'mål'])
+        self.prints['per time lists']['goals'] = buckets.per_bucket(['mål'])
         self.prints['per time lists']['possession'] = self.get_possession_per_time_list()
         return 
 
-    def add_per_time_lists(self, other) -> dict:
-        '''returns a dict containing the added per time lists'''
-        per_time_dict = dict()
-        for event_type in self.prints['per time lists']:
-            per_time_dict[event_type] = self.prints['per time lists'][event_type] + other.prints['per time lists'][event_type]
-        return per_time_dict
-    
-    def add_sustained_attacks(self, other):
-        '''handles the addition of the sustained attacks'''
-        sa_dict = {team: list() for team in self.teams}
-        for team in sa_dict:
-            sa_dict[team] = self.prints['sustained attacks'][team] + other.prints['sustained attacks'][team]
-        return sa_dict
+    def get_time_buckets(self, N = None, width = None) -> TimeBuckets:
+        '''returns the events counted per part (N parts of the half) or per width seconds, for each team and event
+            made once for each resolution'''
+        if (N, width) not in self.time_buckets:
+            self.time_buckets[(N, width)] = TimeBuckets(self.big_df['sec'], self.big_df['team'], self.big_df['event'], list(self.teams), N = N, width = width)
+        return self.time_buckets[(N, width)]
 
     def make_sustained_attacks(self, min_length = 60, disruption_length = 10) -> dict:
         ''''returns a dict with a list of each game minute, 
         if a team had ball possession for longer than min_length starting that minute the list index is the possession time, else 0
         a possession is if a team has the ball, if it loses it wins back possession within disruption_length, and the other team does not get a stoppage in play'''
         if 'sustained attacks' not in self.prints:
-            sustained_attacks_dict = {team : [0 for i in range(gf.readable_to_sec(self.possession_list[-1][1])//60 + 1)] for team in self.teams}
-            i = 0 
-            while i < len(self.possession_list) - 1:
-                current_team, current_time = self.possession_list[i]
-                attack_time = 0 
-                for j in range(i, len(self.possession_list)):
-                    following_team, following_time  = self.possession_list[j]
-                    # team has the ball
-                    if following_team == current_team:
-                        attack_time += gf.readable_to_sec(self.possession_list[j+1][1])-gf.readable_to_sec(following_time)
-                    # other team has the ball
-                    elif following_team == self.opposite_team(current_team):
-                        # they have the ball long enough or get a break in play
-                        if gf.readable_to_sec(self.possession_list[j+1][1])-gf.readable_to_sec(following_time) > disruption_length or self.possession_list[j+1][0] == None:
-                            break
-                    else:
-                        pass
-                if attack_time >= min_length:
-                    sustained_attacks_dict[current_team][gf.readable_to_sec(current_time)//60] = attack_time
-                i = j
-                self.prints['sustained attacks'] = sustained_attacks_dict
-            return self.prints['sustained attacks']
+            timeline = self.get_possession_timeline()
+            index, team, attack_time = timeline.sustained_attacks(disruption_length)
+            long_enough = np.flatnonzero(attack_time >= min_length)
+            # a minute holds the time of the last attack of a team that starts in it, not a sum. with min_length >= 60 and the times in order no two attacks
+            # of a team start in the same minute, a shorter min_length (or a time that goes back) can give several and then the last one is kept like the lists always have
+            minutes = {(code, sec // 60): i for i, code, sec in zip(long_enough.tolist(), team[long_enough].tolist(), timeline.start[index[long_enough]].tolist())}
+            kept = np.array(sorted(minutes.values()), dtype=np.int64)
+            self.prints['sustained attacks'] = TimeBuckets(timeline.start[index[kept]], [timeline.name(code) for code in team[kept]], ['långt anfall'] * len(kept),
+                                                           list(self.teams), width = 60, end = int(timeline.start[-1]), weights = attack_time[kept]).per_team()
+        return self.prints['sustained attacks']
     
+    def get_sustained_attacks_grid(self, min_lengths = (30, 45, 60, 90, 120), disruption_lengths = (5, 10, 15, 20)) -> pd.DataFrame:
+        '''returns the number of sustained attacks and their possession seconds per team for every pair of min_length and disruption_length,
+            one row per (min length, disruption length, team), to try definitions of a sustained attack without changing make_sustained_attacks
+            the attacks only depend on disruption_length, so there is one sweep per disruption_length and every min_length is a comparison'''
+        timeline = self.get_possession_timeline()
+        min_lengths = np.asarray(min_lengths)
+        rows = list()
+        for disruption_length in disruption_lengths:
+            index, team, attack_time = timeline.sustained_attacks(disruption_length)
+            # (min length x attack) of which attacks are long enough
+            long_enough = attack_time >= min_lengths[:, None]
+            for code, name in enumerate(timeline.teams[:2]):
+                counted = long_enough & (team == code)
+                for min_length, attacks, seconds in zip(min_lengths.tolist(), counted.sum(axis=1).tolist(), (counted * attack_time).sum(axis=1).tolist()):
+                    rows.append((min_length, disruption_length, name, attacks, seconds))
+        return pd.DataFrame(rows, columns=['min length', 'disruption length', 'team', 'attacks', 'seconds'])
+
     def get_expected_goals(self) -> dict:
         '''calculates the XG for both teams and places it in prints'''
         if 'expected goals' not in self.prints:
@@ -246,201 +398,75 @@ class Stats:
     def get_expected_goals_lists(self) -> dict:
         '''calculates the expected goals change over time'''
         if 'expected goals list' not in self.prints:
-            xgl_dict = {'x': [0], self.main_team: [0], self.opposite_team(self.main_team): [0]}
-            st_df = self.get_shottypes_df()
-            for index, row in st_df.iterrows():
-                xgl_dict['x'].append(gf.readable_to_sec(row['time']))
-                delta_xg = constants.expected_goals[row['subevent']]
-                # specialfall eftersom straff har skottyp fast, vi skriver över osv
-                if row['subevent'] == 'fast' and index > 2: # se till att vi inte råkar hamna i bråk med index
-                    if self.big_df.loc[index - 2]['event'] == 'straff' or self.big_df.loc[index - 3]['event'] == 'straff':
-                        delta_xg = constants.expected_goals['straff']
-                shooting_team_xg = xgl_dict[row['team']][-1] + delta_xg
-                xgl_dict[row['team']].append(shooting_team_xg)
-                xgl_dict[self.opposite_team(row['team'])].append(xgl_dict[self.opposite_team(row['team'])][-1])
-            self.prints['expected goals list'] = xgl_dict
+            self.run_event_engine()
+            self.prints['expected goals list'] = self.engine['expected goals list']
         return self.prints['expected goals list']
     
     def get_goals_lists(self) -> dict:
         '''calculates the scored goals lists that are used with expected goals lists'''
         if 'goals lists' not in self.prints:
-            g_df = {self.main_team: [0], self.opposite_team(self.main_team): [0]}
-            st_df = self.get_shottypes_df()
-            for index, row in st_df.iterrows():
-                goal_scored = self.big_df.loc[index - 1]['event'] == 'mål'
-                shooting_team_goals = g_df[row['team']][-1] + int(goal_scored)
-                g_df[row['team']].append(shooting_team_goals)
-                g_df[self.opposite_team(row['team'])].append(g_df[self.opposite_team(row['team'])][-1])
-            self.prints['goals lists'] = g_df
+            self.run_event_engine()
+            self.prints['goals lists'] = self.engine['goals lists']
         return self.prints['goals lists']
 
-    def add_expected_goals_lists(self, other) -> dict:
-        '''handels the addition of the expected goals lists'''
-        xgl_dict = dict()
-        for list_type in self.prints['expected goals list']:
-            max_value = self.prints['expected goals list'][list_type][-1]
-            second_list = [i + max_value for i in other.prints['expected goals list'][list_type]]
-            xgl_dict[list_type] = self.prints['expected goals list'][list_type] + second_list
-        return xgl_dict
-    
-    def add_goals_list(self, other) -> dict:
-        '''handels the addition of the goals lists'''
-        xgl_dict = dict()
-        for list_type in self.prints['goals lists']:
-            max_value = self.prints['goals lists'][list_type][-1]
-            second_list = [i + max_value for i in other.prints['goals lists'][list_type]]
-            xgl_dict[list_type] = self.prints['goals lists'][list_type] + second_list
-        return xgl_dict
-
-    def add_expected_goals(self, other) -> dict:
-        '''handels the addition of the expected goals'''
-        xg_dict = {}
-        for team in self.prints['expected goals']:
-            xg_dict[team] = self.prints['expected goals'][team] + other.prints['expected goals'][team]
-        return xg_dict
-
     def make_40_list(self) -> list:
         '''makes the list of 40 situations for main_team''' 
         if '40' not in self.prints:
-            fourty_list = [0 * i for i in range(gf.readable_to_sec(self.big_df.iloc[-1]['time']) // 60 + 1)]
-            df_40 = self.get_40_df()
-            for index, row in df_40.iterrows():
-                if row['team'] == self.main_team:
-                    fourty_list[gf.readable_to_sec(row['time']) // 60] += 1
-            self.prints['40'] = fourty_list
+            self.prints['40'] = self.get_time_buckets(width = 60).per_team(['40'])[self.main_team]
         return self.prints['40']
     
-    def add_40_list(self, other) -> list:
-        '''handels the addition of the 40 lists'''
-        return self.prints['40'] + other.prints['40']
-
-    def add_sustained_attack(self, other) -> dict:
-        '''returns a dict contianind the added sustained attack dicts'''
-        d = {team : list() for team in self.teams}
-        for team in self.prints['sustained attack']:
-            d[team] = self.prints['sustained attack'][team] + other.prints['sustained attack'][team] 
-        return d
-
     def get_possession_per_time_list(self) -> list:
-        '''returns the possession per time list'''
-        parts = [gf.readable_to_sec(self.big_df.iloc[-1]['time'])/self.N * i for i in range(self.N+1)][1:]
-        per_time_list = [{team: 0 for team in self.teams} for n in range(self.N)]
-        current_part = 0
-        for i in range(len(self.possession_list) -1):
-            team, time = self.possession_list[i]
-            if team in self.teams:
-                next_time = self.possession_list[i+1][1]
-                # we are still within our part, only including the equals for edge case last index.
-                if gf.readable_to_sec(next_time) <= parts[current_part]:
-                    per_time_list[current_part][team] += gf.readable_to_sec(next_time) - gf.readable_to_sec(time)
-                # we are entering the next part
-                else:
-                    # handling of the possession within this part
-                    per_time_list[current_part][team] += parts[current_part] - gf.readable_to_sec(time)
-                    per_time_list[current_part + 1][team] += gf.readable_to_sec(next_time) - parts[current_part]
-                    current_part += 1
-        for i, part in enumerate(per_time_list):
-            for team in part:
-                part[team] = gf.sec_to_readable(per_time_list[i][team])
-        return per_time_list
+        '''returns the possession per time list, in seconds'''
+        # the edges of the N parts of the half, the same as the per time lists count events in
+        parts = self.get_time_buckets(N = self.N).edges
+        timeline = self.get_possession_timeline()
+        seconds = timeline.seconds(parts[:-1], parts[1:])
+        # whole seconds, like sec_to_readable used to round them
+        # a part with a time out of order (or a clock that doesn't start at 0) can get a negative possession, it has always counted as 0
+        return [{team: max(0, int(seconds[n, timeline.code(team)] // 1)) for team in self.teams} for n in range(self.N)]
         
-    def get_per_time_list(self, df: pd.core.frame.DataFrame) -> list:
-        '''returns a list of the occurrence of the events in the df'''
-        times = [gf.readable_to_sec(self.big_df.iloc[-1]['time'])/self.N * i for i in range(self.N+1)]
-        limits = [(times[i], times[i+1]) for i in range(self.N)]
-        per_time_list = [{team: 0 for team in self.teams} for n in range(self.N)]
-        for index, row in df.iterrows():
-            for i, span in enumerate(limits):
-                if gf.readable_to_sec(row['time']) > span[0] and gf.readable_to_sec(row['time']) <= span[1]:
-                    per_time_list[i][row['team']] += 1
-        return per_time_list
-
     def get_duel_zones_dict(self) -> dict:
         '''returns a dictionary of where the duels happened, and who won them'''
         if 'duel zones' not in self.prints:
-            duel_zones = {'z' + str(i): {team: 0 for team in self.teams} for i in range(1, 10)}
-            duels_df = self.get_duels_df()
-            for index, row in duels_df.iterrows():
-                if row['zone'] != '0':
-                    duel_zones[row['zone']][row['team']] += 1
-            self.prints['duel zones'] = duel_zones
+            zones = self.count_cube.count_by('zone', events=['närkamp', 'brytning'], zones=Game.zones)
+            self.prints['duel zones'] = {'z' + str(i): {team: zones[team].get('z' + str(i), 0) for team in zones} for i in range(1, 10)}
         return self.prints['duel zones']
 
     def get_freeshot_zones_dict(self) -> dict:
         '''returns a dictionary of where the freeshots (frislag) happened, and by whom'''
         if 'freeshot zones' not in self.prints:
-            freeshot_zones = {'z' + str(i): {team: 0 for team in self.teams} for i in range(1, 10)}
-            freeshots_df = self.get_freeshots_df()
-            for index, row in freeshots_df.iterrows():
-                if row['zone'] != '0':
-                    freeshot_zones[row['zone']][row['team']] += 1
-            self.prints['freeshot zones'] = freeshot_zones
+            zones = self.count_cube.count_by('zone', events=['frislag'], zones=Game.zones)
+            self.prints['freeshot zones'] = {'z' + str(i): {team: zones[team].get('z' + str(i), 0) for team in zones} for i in range(1, 10)}
         return self.prints['freeshot zones']
 
     def get_goal_types(self) -> dict:
-        '''returns the goal types dict of the object and populates prints'''
+        '''returns the goal types dict of the object and populates prints
+            a goal at the end of the half has no shot type until its skottyp row is appended, and is not counted yet'''
         if 'goal types' not in self.prints:
             gt_dict = {t: {st: 0 for st in Game.events_and_their_subevents['skottyp']} for t in self.teams}
-            for goal in self.get_goals_info_list():
-                gt_dict[goal['team']][goal['shot type']] += 1
-        self.prints['goal types'] = gt_dict
+            goals = self.get_goals_info_df()
+            for (team, shot_type), n in goals.loc[goals['shot type'].notna()].groupby(['team', 'shot type'], dropna=False).size().items():
+                gt_dict[team][shot_type] += n
+            self.prints['goal types'] = gt_dict
         return self.prints['goal types']
 
-    def add_goal_types(self, other) -> dict:
-        '''returns the goal types for the added objects'''
-        return gf.combine_dictionaries(self.prints['goal types'], other.prints['goal types'])
-
-    def add_duel_zones(self, other) -> dict:
-        '''returns the duel zones of the added objects'''
-        return_dict = {'z' + str(i): {team: 0 for team in self.teams} for i in range(1, 10)}
-        for zone in self.prints['duel zones']:
-            for team in self.prints['duel zones'][zone]:
-                return_dict[zone][team] = self.prints['duel zones'][zone][team] + other.prints['duel zones'][zone][team]
-        return return_dict
-
-    def add_freeshot_zones(self, other) -> dict:
-        '''returns the freeshot zones of the added objects'''
-        return_dict = {'z' + str(i): {team: 0 for team in self.teams} for i in range(1, 10)}
-        for zone in self.prints['freeshot zones']:
-            for team in self.prints['freeshot zones'][zone]:
-                return_dict[zone][team] = self.prints['freeshot zones'][zone][team] + other.prints['freeshot zones'][zone][team]
-        return return_dict
-
     def get_score_dict(self) -> dict:
         '''returns a dictionary of the score types, get raw score by sum(d[team].values())
             if need be it fills self.prints'''
         if 'score' not in self.prints:
-            score_df = self.get_score_df()
-            subevents = score_df["subevent"].unique()
-            score_dict = {team: {subevent: 0 for subevent in subevents} for team in self.teams}
-            for index, row in score_df.iterrows():
-                score_dict[row['team']][row['subevent']] += 1
-            self.prints['score'] = score_dict
+            score = self.count_cube.count_by('subevent', events=['mål'])
+            subevents = list(dict.fromkeys(subevent for team in score for subevent in score[team]))
+            self.prints['score'] = {team: {subevent: score[team].get(subevent, 0) for subevent in subevents} for team in score}
         return self.prints['score']
 
-    def add_score(self, other) -> dict:
-        '''returns the score of the added objects
-            expects type to already have been checked'''
-        return gf.combine_dictionaries(self.prints['score'], other.prints['score'])
-        
     def get_before_and_after_dict(self) -> dict:
         '''returns a dictionary of the before and after possession from each duel
             if not already done, it'll fill self.prints'''
         if 'before and after' not in self.prints:
-            duels_df = self.get_duels_df()
-            before_after_dict = {team : {t : 0 for t in self.teams} for team in self.teams}   
-            #team_list = [x[0] for x in self.possession_list]
-            time_list = [x[1] for x in self.possession_list]
-            for index, row in duels_df.iterrows():
-                # binary search is O(logn)
-                i = bisect_left(time_list, row['time'])
-                # we find a possession change from duel
-                if time_list[i] == row['time']:
-                    # other team used to have possession, now we do
-                    before_after_dict[self.opposite_team(row['team'])][row['team']] += 1
-                # the duel didn't result in possession change
-                else:
-                    before_after_dict[row['team']][row['team']] += 1
+            before_after_dict = {team : {t : 0 for t in self.teams} for team in self.teams}
+            before, after, zone = self.get_duel_possession()
+            for b, a in zip(before, after):
+                before_after_dict[b][a] += 1
             self.prints['before and after'] = before_after_dict
         return self.prints['before and after']
     
@@ -448,20 +474,11 @@ class Stats:
         '''returns a dictionary of the zones of all duels based on each team's possession before 
             if not already done, it'll fill self.prints'''
         if 'duel zones per team' not in self.prints:
-            duels_df = self.get_duels_df()
-            duel_zones = {team : {z: 0 for z in Game.zones} for team in self.teams}   
-            time_list = [x[1] for x in self.possession_list]
-            for index, row in duels_df.iterrows():
-                if row['zone'] != '0':
-                    # binary search is O(logn)
-                    i = bisect_left(time_list, row['time'])
-                    # we find a possession change from duel
-                    if time_list[i] == row['time']:
-                        # other team used to have possession, now we do
-                        duel_zones[self.opposite_team(row['team'])][row['zone']] += 1
-                    # the duel didn't result in possession change
-                    else:
-                        duel_zones[row['team']][row['zone']] += 1
+            duel_zones = {team : {z: 0 for z in Game.zones} for team in self.teams}
+            before, after, zone = self.get_duel_possession()
+            for b, z in zip(before, zone):
+                if z in duel_zones[b]:
+                    duel_zones[b][z] += 1
             self.prints['duel zones per team'] = duel_zones
         return self.prints['duel zones per team']
     
@@ -470,79 +487,33 @@ class Stats:
             if not already done, it'll fill self.prints
             dictionary of format d[team_before][zone][team_after]'''
         if 'duel winners per zone and team' not in self.prints:
-            duels_df = self.get_duels_df()
             duel_zones = {team :  {z: {t: 0 for t in self.teams} for z in Game.zones} for team in self.teams}
-            time_list = [x[1] for x in self.possession_list]
-            for index, row in duels_df.iterrows():
-                if row['zone'] != '0':
-                    # binary search is O(logn)
-                    i = bisect_left(time_list, row['time'])
-                    # we find a possession change from duel
-                    if time_list[i] == row['time']:
-                        # other team used to have possession, now we do
-                        duel_zones[self.opposite_team(row['team'])][row['zone']][row['team']] += 1
-                    # the duel didn't result in possession change
-                    else:
-                        duel_zones[row['team']][row['zone']][row['team']] += 1
+            before, after, zone = self.get_duel_possession()
+            for b, z, a in zip(before, zone, after):
+                if z in duel_zones[b]:
+                    duel_zones[b][z][a] += 1
             self.prints['duel winners per zone and team'] = duel_zones
         return self.prints['duel winners per zone and team']
     
-    def add_before_and_after(self, other) -> dict:
-        '''handels addition for the before and after stats'''
-        return_dict = {team: dict() for team in self.teams} 
-        for before in self.prints['before and after']:
-            for after in self.prints['before and after'][before]:
-                return_dict[before][after] = self.prints['before and after'][before][after] + other.prints['before and after'][before][after]
-        return return_dict
-    
-    def add_duel_winners_per_zone_and_team(self, other) -> dict:
-        '''handles the addition for the duel winners per zone and team'''
-        return_dict = {team: {z : {t: 0 for t in self.teams} for z in Game.zones} for team in self.teams}
-        for team in self.prints['duel winners per zone and team']:
-            for zone in self.prints['duel winners per zone and team'][team]:
-                for t in self.prints['duel winners per zone and team'][team][zone]:
-                    return_dict[team][zone][t] = self.prints['duel winners per zone and team'][team][zone][t] + other.prints['duel winners per zone and team'][team][zone][t]
-        return return_dict
-    
-    def add_duel_zones_per_team(self, other) -> dict:
-        '''handles the addition for the duel zones per teams'''
-        return_dict = {team: dict() for team in self.teams}
-        for team in self.prints['duel zones per team']:
-            for zone in self.prints['duel zones per team'][team]:
-                return_dict[team][zone] = self.prints['duel zones per team'][team][zone] + other.prints['duel zones per team'][team][zone]
-        return return_dict
-    
     def get_duels_dict(self) -> dict:
         '''returns a dictionary of the duels
             if need be it fills self.prints'''
         if 'duels' not in self.prints:
-            duels_df = self.get_duels_df()
-            duels_dict = {team: 0 for team in self.teams}
-            for team in duels_dict:
-                duels_dict[team] = len(duels_df.loc[duels_df['team'] == team].index)
-            self.prints['duels'] = duels_dict
+            self.prints['duels'] = self.count_cube.count(events=['närkamp', 'brytning'])
         return self.prints['duels']
 
     def get_slot_passes_dict(self) -> dict:
         '''returns a dictionary of the slot passes
             if need be it fills self.prints'''
         if 'slot passes' not in self.prints:
-            sp_df = self.get_slot_passes_df()
-            sp_dict = {team: 0 for team in self.teams}
-            for team in sp_dict:
-                sp_dict[team] = len(sp_df.loc[sp_df['team'] == team].index)
-            self.prints['slot passes'] = sp_dict
+            self.prints['slot passes'] = self.count_cube.count(subevents=['straffområde'])
         return self.prints['slot passes']
     
     def get_long_passes_dict(self) -> dict:
         '''returns a dictionary of the long passes (passning - lång, farlig)
             if need be it fills self.prints'''
         if 'long passes' not in self.prints:
-            lp_df = self.get_long_passes_df()
-            lp_dict = {team: 0 for team in self.teams}
-            for team in lp_dict:
-                lp_dict[team] = len(lp_df.loc[lp_df['team'] == team].index)
-            self.prints['long passes'] = lp_dict
+            self.prints['long passes'] = self.count_cube.count(subevents=['lång', 'farlig'])
         return self.prints['long passes']
 
 
@@ -550,152 +521,58 @@ class Stats:
         '''returns a dictionary of the interceptions
             if need be it fills self.prints'''
         if 'interceptions' not in self.prints:
-            interceptions_df = self.get_interceptions_df()
-            interceptions_dict = {team: 0 for team in self.teams}
-            for team in interceptions_dict:
-                interceptions_dict[team] = len(interceptions_df.loc[interceptions_df['team'] == team].index)
-            self.prints['interceptions'] = interceptions_dict
+            self.prints['interceptions'] = self.count_cube.count(events=['brytning'])
         return self.prints['interceptions']
 
     def get_lost_balls_dict(self) -> dict:
         '''returns a dictionary of the lost balls
             if need be it fills self.prints'''
         if 'lost balls' not in self.prints:
-            lost_balls_df = self.get_lost_balls_df()
-            lost_balls_dict = {team: 0 for team in self.teams}
-            for team in lost_balls_dict:
-                lost_balls_dict[team] = len(lost_balls_df.loc[lost_balls_df['team'] == team].index)
-            self.prints['lost balls'] = lost_balls_dict
+            self.prints['lost balls'] = self.count_cube.count(events=['bolltapp'])
         return self.prints['lost balls']
     
     def get_penalties_dict(self) -> dict:
         '''returns a dictionary of the penalties
             if need be it fills self.prints'''
         if 'penalties' not in self.prints:
-            penalties_df = self.get_penalties_df()
-            penalties_dict = {team: 0 for team in self.teams}
-            for team in penalties_dict:
-                penalties_dict[team] = len(penalties_df.loc[penalties_df['team'] == team].index)
-            self.prints['penalties'] = penalties_dict
+            self.prints['penalties'] = self.count_cube.count(events=['utvisning'])
         return self.prints['penalties']
 
     def get_scrimmages_dict(self) -> dict:
         '''returns a dictionary of the scrimmages (närkamper)
             if need be it fills self.prints'''
         if 'scrimmages' not in self.prints:
-            scrimmages_df = self.get_scrimmages_df()
-            scrimmages_dict = {team: 0 for team in self.teams}
-            for team in scrimmages_dict:
-                scrimmages_dict[team] = len(scrimmages_df.loc[scrimmages_df['team'] == team].index)
-            self.prints['scrimmages'] = scrimmages_dict
+            self.prints['scrimmages'] = self.count_cube.count(events=['närkamp'])
         return self.prints['scrimmages']
 
     def get_corners_dict(self) -> dict: 
         '''returns a dictionary of the corners and based on left right then team
             if need be it fills self.prints'''
         if 'corners' not in self.prints:
-            corners_df = self.get_corners_df()
-            corners_dict = {team: {side: 0 for side in Stats.corner_sides} for team in self.teams}
-            for team in corners_dict:
-                for side in corners_dict[team]: # self.big_df['event'].isin(['skott', 'mål'])
-                    corners_dict[team][side] = len(corners_df.loc[(corners_df['team'] == team) & (corners_df['zone'].isin(Stats.corner_sides[side]))].index)
-            self.prints['corners'] = corners_dict
+            zones = self.count_cube.count_by('zone', events=['hörna'])
+            self.prints['corners'] = {team: {side: sum(zones[team].get(zone, 0) for zone in Stats.corner_sides[side]) for side in Stats.corner_sides} for team in zones}
         return self.prints['corners']
     
     def get_corner_goal_sides(self) -> dict:
         '''returns a dictionary of what side the corner goals are scored from'''
         if 'corner goal sides' not in self.prints:
             corners_dict = {team: {side: 0 for side in Stats.corner_sides} for team in self.teams}
-            for goal in self.get_goals_info_list():
-                if goal['subevent'] == 'hörnmål' and goal['origin zone'] != '0': # 'origin zone'
-                    corners_dict[goal['team']][Stats.corner_names(goal['origin zone'])] += 1
+            goals = self.get_goals_info_df()
+            corner_goals = goals.loc[(goals['subevent'] == 'hörnmål') & (goals['origin zone'] != '0')]
+            for team, zone in zip(corner_goals['team'], corner_goals['origin zone']):
+                corners_dict[team][Stats.corner_names(zone)] += 1
             self.prints['corner goal sides'] = corners_dict
         return self.prints['corner goal sides']
 
-    def add_corner_goal_sides(self, other):
-        '''handles the addition of the corner goal sides'''
-        return gf.combine_dictionaries(self.get_corner_goal_sides(), other.get_corner_goal_sides())
-
     def get_sog_dict(self) -> dict:
         '''returns a dictionary of the shots on goal
             if need be it fills self.prints'''
         if 'shots on goal' not in self.prints:
-            sog_df = self.get_sog_df()
-            sog_dict = {team: 0 for team in self.teams}
-            for team in sog_dict:
-                sog_dict[team] = len(sog_df.loc[sog_df['team'] == team].index)
-            self.prints['shots on goal'] = sog_dict
+            # räddning is only a subevent of skott, so no event is counted twice
+            goals, saves = self.count_cube.count(events=['mål']), self.count_cube.count(subevents=['räddning'])
+            self.prints['shots on goal'] = {team: goals[team] + saves[team] for team in goals}
         return self.prints['shots on goal']
 
-    def add_duels(self, other) -> dict:
-        '''returns the duels of the added objects
-            expects type to already have been checked'''
-        return_dict = dict()
-        for team in self.prints['duels']:
-            return_dict[team] = self.prints['duels'][team] + other.prints['duels'][team]
-        return return_dict
-
-    def add_interceptions(self, other) -> dict:
-        '''returns the interceptions of the added objects
-            expects type to already have been checked'''
-        return_dict = dict()
-        for team in self.prints['interceptions']:
-            return_dict[team] = self.prints['interceptions'][team] + other.prints['interceptions'][team]
-        return return_dict
-
-    def add_lost_balls(self, other) -> dict:
-        '''returns the lost balls of the added objects
-            expects type to already have been checked'''
-        return_dict = dict()
-        for team in self.prints['lost balls']:
-            return_dict[team] = self.prints['lost balls'][team] + other.prints['lost balls'][team]
-        return return_dict
-    
-    def add_penalties(self, other) -> dict:
-        '''returns the penalties of the added objects
-            expects type to already have been checked'''
-        return_dict = dict()
-        for team in self.prints['penalties']:
-            return_dict[team] = self.prints['penalties'][team] + other.prints['penalties'][team]
-        return return_dict
-    
-    def add_scrimmages(self, other) -> dict:
-        '''returns the scrimmages (närkamper) of the added objects
-            expects type to already have been checked'''
-        return_dict = dict()
-        for team in self.prints['scrimmages']:
-            return_dict[team] = self.prints['scrimmages'][team] + other.prints['scrimmages'][team]
-        return return_dict
-
-    def add_sog(self, other) -> dict:
-        '''returns the shots on goal of the added objects
-            expects type to already have been checked'''
-        return_dict = dict()
-        for team in self.prints['shots on goal']:
-            return_dict[team] = self.prints['shots on goal'][team] + other.prints['shots on goal'][team]
-        return return_dict 
-    
-    def add_slot_passes(self, other) -> dict:
-        '''returns the slot passes (passning - straffområde) of the added objects
-            expects type to already have been checked'''
-        return_dict = dict()
-        for team in self.prints['slot passes']:
-            return_dict[team] = self.prints['slot passes'][team] + other.prints['slot passes'][team]
-        return return_dict 
-    
-    def add_long_passes(self, other) -> dict:
-        '''returns the long passes (passning - lång, farlig) of the added objects
-            expects type to already have been checked'''
-        return_dict = dict()
-        for team in self.prints['long passes']:
-            return_dict[team] = self.prints['long passes'][team] + other.prints['long passes'][team]
-        return return_dict 
-
-    def add_corners(self, other) -> dict:
-        '''returns the corners for the added objects
-            expects type to already have been checked'''   
-        return gf.combine_dictionaries(self.prints['corners'], other.prints['corners']) 
-
     def get_possession_dict(self) -> dict:
         '''returns a dictionary of the possession
             if need be it fills self.prints'''
@@ -705,95 +582,49 @@ class Stats:
             self.make_per_time_lists()
             for d in self.prints['per time lists']['possession']:
                 for team in d:
-                    try:
-                        poss_dict[team] += gf.readable_to_sec(d[team]) 
-                    except:
-                        pass
-            for team in poss_dict:
-                poss_dict[team] = gf.sec_to_readable(poss_dict[team])
+                    if team in poss_dict:
+                        poss_dict[team] += d[team]
             self.prints['possession'] = poss_dict
         return self.prints['possession']
 
-    def add_possession(self, other) -> dict:
-        '''returns the possession of the two added objects
-            expects type to already have been checked'''
-        return_dict = dict()
-        for team in self.prints['possession']:
-            return_dict[team] = gf.sec_to_readable(gf.readable_to_sec(self.prints['possession'][team]) + gf.readable_to_sec(other.prints['possession'][team]))
-        return return_dict
-
     def get_penalty_shots_dict(self) -> dict:
         '''returns a dictionary of the penalty shots (straff) for each team
             if need be if fills self.prints'''
         if 'penalty shots' not in self.prints:
-            ps_dict = {team: 0 for team in self.teams}
-            ps_df = self.get_penalty_shot_df()
-            for team in ps_dict:
-                ps_dict[team] = len(ps_df.loc[ps_df['team'] == team].index)
-            self.prints['penalty shots'] = ps_dict
+            self.prints['penalty shots'] = self.count_cube.count(events=['straff'])
         return self.prints['penalty shots']
     
-    def add_penalty_shots(self, other) -> dict:
-        '''handels the addition of the penalty shots (straff)
-            expects type to already have been checked'''
-        return_dict = dict()
-        for team in self.prints['penalty shots']:
-            return_dict[team] = self.prints['penalty shots'][team] + other.prints['penalty shots'][team]
-        return return_dict
-
     def get_shottypes_dict(self) -> dict:
         '''returns a dictionary of the shot types
             if need be it fills self.prints'''
         if 'shot types' not in self.prints:
-            st_dict = {team: dict() for team in self.teams}
-            for team in self.teams:
-                st_df = self.get_shottypes_df().loc[self.get_shottypes_df()['team'] == team]
-                for shottype in Game.events_and_their_subevents['skottyp']:
-                    if len(st_df.loc[st_df['subevent'] == shottype].index) > 0:
-                        st_dict[team][shottype] = len(st_df.loc[st_df['subevent'] == shottype].index)
-            self.prints['shot types'] = st_dict
+            shot_types = self.count_cube.count_by('subevent', events=['skottyp'])
+            self.prints['shot types'] = {team: {st: shot_types[team][st] for st in Game.events_and_their_subevents['skottyp'] if st in shot_types[team]} for team in shot_types}
         return self.prints['shot types']
 
-    def add_shottypes(self, other) -> dict:
-        '''returns the shot types of the added objects
-            expects type to already have been checked'''
-        return_dict = {team: dict() for team in self.teams}
-        for team in self.prints['shot types']:
-            for shottype in self.prints['shot types'][team]:
-                if shottype in other.prints['shot types'][team]:
-                    return_dict[team][shottype] = self.prints['shot types'][team][shottype] + other.prints['shot types'][team][shottype]
-                else:
-                    return_dict[team][shottype] = self.prints['shot types'][team][shottype] 
-            for shottype in other.prints['shot types'][team]:
-                if shottype not in return_dict[team]:
-                    return_dict[team][shottype] = other.prints['shot types'][team][shottype]
-        return return_dict
-
     def get_goal_origins_df(self) -> pd.core.frame.DataFrame:
         '''returns a df object of only goals and their origins
             fils df_dict if need be'''
         if 'goal origins' not in self.df_dict:
-            goals_df = self.get_shot_origins_df().loc[self.get_shot_origins_df()['goal'] == True].drop('goal', axis=1)
-            self.df_dict['goal origins'] = goals_df
+            self.run_event_engine()
+            self.df_dict['goal origins'] = self.get_shot_origins_df().iloc[self.engine['goals']['shot']].drop('goal', axis=1)
         return self.df_dict['goal origins']
 
+    def get_goals_info_df(self) -> pd.core.frame.DataFrame:
+        '''returns a df with one row per goal: time, team, subevent, zone, shot type, origin, attack time and origin zone
+            the goals of run_event_engine joined with their rows in the shot origins, made once and kept in df_dict'''
+        if 'goals info' not in self.df_dict:
+            self.run_event_engine()
+            goals = self.engine['goals']
+            origins = self.get_shot_origins_df().iloc[goals['shot']]
+            self.df_dict['goals info'] = pd.DataFrame({'time': origins['shot time'].tolist(), 'team': goals['team'], 'subevent': goals['subevent'],
+                                                       'zone': goals['zone'], 'shot type': goals['shot type'], 'origin': origins['shot origin'].tolist(),
+                                                       'attack time': origins['attack time'].tolist(), 'origin zone': origins['origin zone'].tolist()})
+        return self.df_dict['goals info']
+
     def get_goals_info_list(self) -> list:
-        '''returns a list with the info for all goals'''
-        goals_list = list()
-        df = self.big_df.loc[self.big_df['event'] == 'mål']
-        for index, row in df.iterrows():
-            d = dict()
-            d['time'] = row['time']
-            d['team'] = row['team']
-            d['subevent'] = row['subevent']
-            d['zone'] = row['zone']
-            d['shot type'] = self.big_df.loc[index + 1]['subevent']
-            goals_list.append(d)
-        for i, d in enumerate(goals_list):
-            d['origin'] = self.get_goal_origins_list()[i][1]
-            d['attack time'] = self.get_goal_origins_list()[i][2]
-            d['origin zone'] = self.get_goal_origins_list()[i][4]
-        return goals_list        
+        '''returns a list with the info for all goals, a dict per goal'''
+        return self.get_goals_info_df().to_dict('records')
 
     def get_goal_origins_list(self) -> list:
         '''returns a list of the goal events'''
@@ -803,128 +634,185 @@ class Stats:
         '''returns a df object of shot origins
             fills the df_dict if need be'''
         if 'shot origins' not in self.df_dict:
-            keys = ['team', 'shot origin', 'attack time',  'shot time', 'goal', 'origin zone']
-            values = [[] for i in range(len(keys))]
-            possession_team = None
-            possession_gained = None
-            time_gained = 0 
-            origin_zone = None
-
-            for index, row in self.big_df.iterrows():
-                # a shot is made; save shot origin info
-                if row['event'] == 'skott' or row['event'] == 'mål':
-                    values[0].append(possession_team)
-                    values[1].append(possession_gained)
-                    values[2].append(gf.readable_to_sec(row['time']) - time_gained)
-                    values[3].append(row['time'])
-                    values[4].append(row['event'] == 'mål')
-                    values[5].append(origin_zone)
-                # new team gains possession OR new start of play
-                elif (row['event'] in Stats.possession_gained and row['team'] != possession_team) or row['event'] in Stats.start_of_play:
-                    possession_team = row['team']
-                    possession_gained = row['event']
-                    time_gained = gf.readable_to_sec(row['time'])
-                    origin_zone = row['zone']
-                # old team loses possession
-                elif row['event'] in Stats.possession_lost and row['team'] == possession_team:
-                    possession_team = self.opposite_team(row['team'])
-                    possession_gained = row['event']
-                    time_gained = gf.readable_to_sec(row['time'])
-                    origin_zone = row['zone']
-            self.df_dict['shot origins'] = gf.make_df(keys, values)
+            self.run_event_engine()
+            self.df_dict['shot origins'] = gf.make_df(['team', 'shot origin', 'attack time',  'shot time', 'goal', 'origin zone'], self.engine['shot origins'])
         return self.df_dict['shot origins']
 
     def get_shot_origins_dict(self) -> dict:
         '''returns a dictionary of the shot origins
             if need be it fills self.prints'''
         if 'shot origins' not in self.prints:
-            so_df = self.get_shot_origins_df()
+            self.run_event_engine()
             so_dict = {team: dict() for team in self.teams}
-            for index, row in so_df.iterrows():
-                if row['shot origin'] in so_dict[row['team']]:
-                    so_dict[row['team']][row['shot origin']] += 1
+            for team, shot_origin in zip(self.engine['shot origins'][0], self.engine['shot origins'][1]):
+                if shot_origin in so_dict[team]:
+                    so_dict[team][shot_origin] += 1
                 else:
-                    so_dict[row['team']][row['shot origin']] = 1
+                    so_dict[team][shot_origin] = 1
             self.prints['shot origins'] = so_dict
         return self.prints['shot origins']
 
-    def add_shot_origins(self, other) -> dict:
-        '''returns the shot origins of the added objects
-            expects type to already have been checked'''
-        return_dict = {team: dict() for team in self.teams}
-        for team in self.prints['shot origins']:
-            for shotorigin in self.prints['shot origins'][team]:
-                if shotorigin in other.prints['shot origins'][team]:
-                    return_dict[team][shotorigin] = self.prints['shot origins'][team][shotorigin] + other.prints['shot origins'][team][shotorigin]
-                else:
-                    return_dict[team][shotorigin] = self.prints['shot origins'][team][shotorigin] 
-            for shotorigin in other.prints['shot origins'][team]:
-                if shotorigin not in return_dict[team]:
-                    return_dict[team][shotorigin] = other.prints['shot origins'][team][shotorigin]
-        return return_dict
-
-    def note_possession(self, row: pd.core.series.Series, index: int) -> None:
-        '''updates the possession list based on row'''
-        if row['event'] in Stats.possession_gained:
-            if index == 0 or row['team'] != self.possession_list[-1][0]:
-                self.possession_list.append((row['team'], row['time']))
-        elif row['event'] in Stats.possession_lost:
-            if index == 0 or self.opposite_team(row['team']) != self.possession_list[-1][0]:
-                self.possession_list.append((self.opposite_team(row['team']), row['time']))
-        elif row['event'] in Stats.await_next:
-            if index != 0 and self.possession_list[-1][0] != None:
-                self.possession_list.append((None, row['time']))
-        return     
-    
+    def run_event_engine(self) -> None:
+        '''one pass over the events, in order, that makes everything that depends on what happened before an event:
+            the possession list, the shot origins, the goals info, the expected goals and goals lists and the duels, kept in self.engine.
+            the columns are read as plain lists once instead of one iterrows per getter, and every event is one engine_step,
+            so events appended later (see append) continue the same pass'''
+        if len(self.engine) > 0:
+            return
+        df = self.big_df
+        other_team = self.opposite_team(self.main_team)
+        # shot origins are the columns of the shot origins df, see get_shot_origins_df
+        # goals are the columns of the goals info df, see get_goals_info_df, shot is the row of the goal in the shot origins
+        self.engine = {'possession list': list(), 'shot origins': [[] for i in range(6)], 'goals': {'team': [], 'subevent': [], 'zone': [], 'shot type': [], 'shot': []},
+                       'expected goals list': {'x': [0], self.main_team: [0], other_team: [0]}, 'goals lists': {self.main_team: [0], other_team: [0]},
+                       # the time, team and zone of every duel, for the sections on the possession before and after them
+                       'duels': {'sec': [], 'team': [], 'zone': []},
+                       # who has the ball, how they got it, when and where (for the shot origins), the last three events,
+                       # the number of events so far and whether the last one was a goal still waiting for its shot type
+                       'state': {'possession team': None, 'possession gained': None, 'time gained': 0, 'origin zone': None,
+                                 'last events': list(), 'rows': 0, 'goal': False}}
+        for event, team, subevent, zone, sec in zip(df['event'].tolist(), df['team'].tolist(), df['subevent'].tolist(), df['zone'].tolist(), df['sec'].tolist()):
+            self.engine_step(event, team, subevent, zone, sec)
+        return
+
+    def engine_step(self, event: str, team: str, subevent: str, zone: str, sec: int) -> None:
+        '''adds the next event to what run_event_engine has found so far, it only looks at the state kept in self.engine, not at big_df'''
+        state = self.engine['state']
+        possession_list = self.engine['possession list']
+        shot_origins = self.engine['shot origins']
+        goals = self.engine['goals']
+        first = state['rows'] == 0
+        # the shot type of a goal is the subevent of the row after it
+        if state['goal']:
+            goals['shot type'][-1] = subevent
+            state['goal'] = False
+
+        # possession list, a list of (team, sec) where team has the ball from sec on
+        if event in Stats.possession_gained:
+            if first or team != possession_list[-1][0]:
+                possession_list.append((team, sec))
+        elif event in Stats.possession_lost:
+            if first or self.opposite_team(team) != possession_list[-1][0]:
+                possession_list.append((self.opposite_team(team), sec))
+        elif event in Stats.await_next:
+            if not first and possession_list[-1][0] != None:
+                possession_list.append((None, sec))
+
+        # a shot is made; save shot origin info
+        if event == 'skott' or event == 'mål':
+            for i, value in enumerate([state['possession team'], state['possession gained'], sec - state['time gained'], sec, event == 'mål', state['origin zone']]):
+                shot_origins[i].append(value)
+            if event == 'mål':
+                for key, value in zip(goals, [team, subevent, zone, None, len(shot_origins[0]) - 1]):
+                    goals[key].append(value)
+                state['goal'] = True
+        # new team gains possession OR new start of play
+        elif (event in Stats.possession_gained and team != state['possession team']) or event in Stats.start_of_play:
+            state.update({'possession team': team, 'possession gained': event, 'time gained': sec, 'origin zone': zone})
+        # old team loses possession
+        elif event in Stats.possession_lost and team == state['possession team']:
+            state.update({'possession team': self.opposite_team(team), 'possession gained': event, 'time gained': sec, 'origin zone': zone})
+
+        if event in ['närkamp', 'brytning']:
+            for key, value in zip(['sec', 'team', 'zone'], [sec, team, zone]):
+                self.engine['duels'][key].append(value)
+
+        # expected goals and goals over time, one step per shot type
+        if event == 'skottyp':
+            xgl_dict, g_dict, last_events = self.engine['expected goals list'], self.engine['goals lists'], state['last events']
+            xgl_dict['x'].append(sec)
+            delta_xg = constants.expected_goals[subevent]
+            # specialfall eftersom straff har skottyp fast, vi skriver över osv
+            if subevent == 'fast' and state['rows'] > 2: # se till att vi inte råkar hamna i bråk med index
+                if last_events[-2] == 'straff' or last_events[-3] == 'straff':
+                    delta_xg = constants.expected_goals['straff']
+            xgl_dict[team].append(xgl_dict[team][-1] + delta_xg)
+            xgl_dict[self.opposite_team(team)].append(xgl_dict[self.opposite_team(team)][-1])
+            g_dict[team].append(g_dict[team][-1] + int(last_events[-1:] == ['mål']))
+            g_dict[self.opposite_team(team)].append(g_dict[self.opposite_team(team)][-1])
+
+        state['last events'] = state['last events'][-2:] + [event]
+        state['rows'] += 1
+        return
+
     def make_possession_list(self) -> None:
         '''makes the possession list'''
         if len(self.possession_list) == 0:
-            for index, row in self.big_df.iterrows():
-                self.note_possession(row, index)
+            self.run_event_engine()
+            self.possession_list = list(self.engine['possession list'])
         return 
+
+    def get_possession_timeline(self) -> PossessionTimeline:
+        '''returns the possession list as a PossessionTimeline, for questions like who had the ball at a time
+            made again after events that changed the possession list were appended.
+            a time out of order is printed once, it is counted as negative possession (see PossessionTimeline)'''
+        self.run_event_engine()
+        if 'possession timeline' not in self.engine:
+            timeline = PossessionTimeline(self.engine['possession list'], list(self.teams))
+            warned = self.engine.setdefault('times out of order', set())
+            for i in timeline.out_of_order():
+                if int(timeline.end[i]) not in warned:
+                    warned.add(int(timeline.end[i]))
+                    print(f'{self.out}: the time goes back from {gf.sec_to_readable(int(timeline.start[i]))} to {gf.sec_to_readable(int(timeline.end[i]))}, one of them is likely wrong')
+            self.engine['possession timeline'] = timeline
+        return self.engine['possession timeline']
         
+    def get_events_df(self, events = (), subevents = ()) -> pd.core.frame.DataFrame:
+        '''returns the rows of big_df with any of events or any of subevents
+            taken from the event index each time, so that no filtered copies of big_df are kept'''
+        return self.big_df.take(self.event_index.rows(events, subevents))
+
     def get_shots_df(self) -> pd.core.frame.DataFrame:
-        '''returns a df with only the outcome events from shots
-            populates the df_dict if not already done'''
-        if 'shots' not in self.df_dict:
-            self.df_dict['shots'] = self.big_df.loc[self.big_df['event'].isin(['skott', 'mål'])]
-        return self.df_dict['shots'] 
+        '''returns a df with only the outcome events from shots'''
+        return self.get_events_df(events=['skott', 'mål'])
 
     def get_40_df(self) -> pd.core.frame.DataFrame:
-        '''returns a df with only the 40 events
-            populates the df_dict if not already done'''
-        if '40' not in self.df_dict:
-            self.df_dict['40'] = self.big_df.loc[(self.big_df['event'] == '40')]
-        return self.df_dict['40'] 
+        '''returns a df with only the 40 events'''
+        return self.get_events_df(events=['40'])
 
     def get_sog_df(self) -> pd.core.frame.DataFrame:
-        '''returns a df with the shots on goal
-            populates the df_dict if not already done'''
-        if 'shots on goal' not in self.df_dict:
-            # bitwise comparison
-            self.df_dict['shots on goal'] = self.big_df.loc[(self.big_df['subevent'] == 'räddning') | (self.big_df['event'] == 'mål')]
-        return self.df_dict['shots on goal'] 
+        '''returns a df with the shots on goal'''
+        return self.get_events_df(events=['mål'], subevents=['räddning'])
              
     def get_shottypes_df(self) -> pd.core.frame.DataFrame:
-        '''returns a df with only the the shot types
-            populates the df_dict if not already done'''
-        if 'shot types' not in self.df_dict:
-            self.df_dict['shot types'] = self.big_df.loc[self.big_df['event'] == 'skottyp']
-        return self.df_dict['shot types'] 
+        '''returns a df with only the the shot types'''
+        return self.get_events_df(events=['skottyp'])
     
     def get_score_df(self) -> pd.core.frame.DataFrame:
-        '''returns a df with only the the goals
-            populates the df_dict if not already done'''
-        if 'goals' not in self.df_dict:
-            self.df_dict['goals'] = self.big_df.loc[self.big_df['event'] == 'mål']
-        return self.df_dict['goals'] 
+        '''returns a df with only the the goals'''
+        return self.get_events_df(events=['mål'])
 
     def get_duels_df(self) -> pd.core.frame.DataFrame:
-        '''returns a df with only the the duels
+        '''returns a df with only the the duels'''
+        return self.get_events_df(events=['närkamp', 'brytning'])
+
+    def get_duel_possession(self) -> tuple:
+        '''returns (possession before, possession after, zone) lists with an entry per duel of the two teams, like the columns of get_duel_possession_df
+            made from the duels the event engine kept instead of big_df, so it is cheap to make again after an event is appended'''
+        self.run_event_engine()
+        duels = self.engine['duels']
+        teams = list(self.teams)
+        after = np.array([teams.index(team) if team in self.teams else -1 for team in duels['team']], dtype=np.int64)
+        change = self.get_possession_timeline().changes_at(np.array(duels['sec'], dtype=np.int64))
+        before = np.where(change & (after >= 0), 1 - after, after)
+        kept = np.flatnonzero(after >= 0).tolist()
+        return [teams[before[i]] for i in kept], [teams[after[i]] for i in kept], [duels['zone'][i] for i in kept]
+
+    def get_duel_possession_df(self) -> pd.core.frame.DataFrame:
+        '''returns the duels df with who had the ball before and after each duel, in the columns possession before and possession after
+            the team of a duel has the ball after it, and if the ball changed hands at the duel the other team had it before.
+            the duel times are joined to the possession changes with one np.searchsorted (PossessionTimeline.changes_at).
+            duels of other teams than the two playing (like '0') get no possession
             populates the df_dict if not already done'''
-        if 'duels' not in self.df_dict:
-            self.df_dict['duels'] = self.big_df.loc[self.big_df['event'].isin(['närkamp', 'brytning'])]
-        return self.df_dict['duels'] 
+        if 'duel possession' not in self.df_dict:
+            duels_df = self.get_duels_df()
+            teams = list(self.teams)
+            change = self.get_possession_timeline().changes_at(duels_df['sec'].to_numpy())
+            after = pd.Categorical(duels_df['team'].astype(object), categories=teams).codes
+            before = np.where(change & (after >= 0), 1 - after, after)
+            self.df_dict['duel possession'] = duels_df.assign(**{'possession before': pd.Categorical.from_codes(before, categories=teams),
+                                                                 'possession after': pd.Categorical.from_codes(after, categories=teams)})
+        return self.df_dict['duel possession']
 
     def opposite_team(self, team: str) -> str:
         '''returns the opposite team of input
@@ -932,71 +820,41 @@ class Stats:
         return self.teams.difference({team}).pop()
 
     def get_interceptions_df(self) -> pd.core.frame.DataFrame:
-        '''returns a df with only the the interceptions
-            populates the df_dict if not already done'''
-        if 'interceptions' not in self.df_dict:
-            self.df_dict['interceptions'] = self.big_df.loc[self.big_df['event'] == 'brytning']
-        return self.df_dict['interceptions'] 
+        '''returns a df with only the the interceptions'''
+        return self.get_events_df(events=['brytning'])
     
     def get_freeshots_df(self) -> pd.core.frame.DataFrame:
-        '''returns a df with only the the freeshots (frislag)
-            populates the df_dict if not already done'''
-        if 'freeshots' not in self.df_dict:
-            self.df_dict['freeshots'] = self.big_df.loc[self.big_df['event'] == 'frislag']
-        return self.df_dict['freeshots'] 
+        '''returns a df with only the the freeshots (frislag)'''
+        return self.get_events_df(events=['frislag'])
 
     def get_lost_balls_df(self) -> pd.core.frame.DataFrame:
-        '''returns a df with only the the lost balls
-            populates the df_dict if not already done'''
-        if 'lost balls' not in self.df_dict:
-            self.df_dict['lost balls'] = self.big_df.loc[self.big_df['event'] == 'bolltapp']
-        return self.df_dict['lost balls'] 
+        '''returns a df with only the the lost balls'''
+        return self.get_events_df(events=['bolltapp'])
 
     def get_scrimmages_df(self) -> pd.core.frame.DataFrame:
-        '''returns a df with only the the scrimmages (närkamper)
-            populates the df_dict if not already done'''
-        if 'scrimmages' not in self.df_dict:
-            self.df_dict['scrimmages'] = self.big_df.loc[self.big_df['event'] == 'närkamp']
-        return self.df_dict['scrimmages'] 
+        '''returns a df with only the the scrimmages (närkamper)'''
+        return self.get_events_df(events=['närkamp'])
 
     def get_corners_df(self) -> pd.core.frame.DataFrame:
-        '''returns a df with only the the corners
-            populates the df_dict if not already done'''
-        if 'corners' not in self.df_dict:
-            self.df_dict['corners'] = self.big_df.loc[self.big_df['event'] == 'hörna']
-        return self.df_dict['corners'] 
+        '''returns a df with only the the corners'''
+        return self.get_events_df(events=['hörna'])
 
     def get_slot_passes_df(self) -> pd.core.frame.DataFrame:
-        '''returns a df with only the the slot passes (passning - straffområde)
-            populates the df_dict if not already done'''
-        if 'slot passes' not in self.df_dict:
-            self.df_dict['slot passes'] = self.big_df.loc[self.big_df['subevent'] == 'straffområde']
-        return self.df_dict['slot passes'] 
+        '''returns a df with only the the slot passes (passning - straffområde)'''
+        return self.get_events_df(subevents=['straffområde'])
 
     def get_long_passes_df(self) -> pd.core.frame.DataFrame:
-        '''returns a df with only the the long passes (passning - lång, farlig)
-            populates the df_dict if not already done'''
-        if 'long passes' not in self.df_dict:
-            self.df_dict['long passes'] = self.big_df.loc[self.big_df['subevent'].isin(['lång', 'farlig'])]
-        return self.df_dict['long passes'] 
+        '''returns a df with only the the long passes (passning - lång, farlig)'''
+        return self.get_events_df(subevents=['lång', 'farlig'])
 
     def get_penalties_df(self) -> pd.core.frame.DataFrame:
-        '''returns a df with only the the penaties
-            populates the df_dict if not already done'''
-        if 'penalties' not in self.df_dict:
-            self.df_dict['penalties'] = self.big_df.loc[self.big_df['event'] == 'utvisning']
-        return self.df_dict['penalties'] 
+        '''returns a df with only the the penaties'''
+        return self.get_events_df(events=['utvisning'])
 
     def get_long_shots_df(self) -> pd.core.frame.DataFrame:
-        '''returns a ff with only the long shots (skottyp: utifrån)
-            populates the df_dict if not already done'''
-        if 'long shots' not in self.df_dict:
-            self.df_dict['long shots'] = self.big_df.loc[self.big_df['subevent'] == 'utifrån']
-        return self.df_dict['long shots'] 
+        '''returns a ff with only the long shots (skottyp: utifrån)'''
+        return self.get_events_df(subevents=['utifrån'])
     
     def get_penalty_shot_df(self) -> pd.core.frame.DataFrame:
-        '''returns a df with only the the penalty shots (straff)
-            populates the df_dict if not already done'''
-        if 'penalty shot' not in self.df_dict:
-            self.df_dict['penalty shot'] = self.big_df.loc[self.big_df['event'] == 'straff']
-        return self.df_dict['penalty shot'] 
\ No newline at end of file
+        '''returns a df with only the the penalty shots (straff)'''
+        return self.get_events_df(events=['straff'])
\ No newline at end of file
@@ -0,0 +1,67 @@
+class LazyPrints(dict):
+    '''the prints of a Stats object, each section is computed by its getter the first time it is read and then kept
+        while a section is computed every other section it reads is noted as one of its dependencies,
+        so that invalidate can drop a section together with everything that was made from it'''
+
+    # constructor
+    def __init__(self, stats, sections: dict) -> None:
+        '''sections maps each section to the name of the method of stats that fills it'''
+        super().__init__()
+        self.stats = stats
+        self.sections = sections
+        # section -> the sections it read while it was computed
+        self.dependencies = dict()
+        # the sections being computed right now, innermost last
+        self.computing = list()
+        return
+
+# dunder getitem, setitem and missing, for prints[section]
+    def __getitem__(self, key):
+        self.note_dependency(key)
+        return super().__getitem__(key)
+
+    def __setitem__(self, key, value) -> None:
+        # a getter that calls another getter directly only sets its section
+        self.note_dependency(key)
+        super().__setitem__(key, value)
+        return
+
+    def __missing__(self, key):
+        if key not in self.sections or key in self.computing:
+            raise KeyError(key)
+        self.computing.append(key)
+        try:
+            getattr(self.stats, self.sections[key])()
+        finally:
+            self.computing.pop()
+        return super().__getitem__(key)
+
+# dunder reduce, for pickle (Stats objects are sent to other processes)
+    def __reduce__(self):
+        # made empty first and filled after, so that __setitem__ has what it needs
+        return (LazyPrints, (None, self.sections), {'stats': self.stats, 'dependencies': self.dependencies}, None, iter(self.items()))
+
+# non-static methods
+    def note_dependency(self, key: str) -> None:
+        '''notes that the section being computed uses key'''
+        if len(self.computing) > 0 and key != self.computing[-1]:
+            self.dependencies.setdefault(self.computing[-1], set()).add(key)
+        return
+
+    def dependents(self, key: str) -> set:
+        '''returns the sections that were made from key, directly or through other sections'''
+        found = set()
+        new = {key}
+        while len(new) > 0:
+            new = {section for section, used in self.dependencies.items() if len(used & new) > 0} - found
+            found |= new
+        return found
+
+    def invalidate(self, key: str) -> set:
+        '''drops key and every section made from it, they are computed again when read next time
+            returns the sections that were dropped'''
+        dropped = {section for section in self.dependents(key) | {key} if section in self}
+        for section in dropped:
+            del self[section]
+            self.dependencies.pop(section, None)
+        return dropped
@@ -0,0 +1,81 @@
+import pandas as pd
+from get_data import Game
+from get_stats import Stats
+from event_log import EventLog
+
+
+class LiveGame:
+    '''the clean rows of a half that is still being collected, kept up to date one raw record at a time
+        Stats can be made from it at any moment during the game without cleaning the whole file again'''
+
+    # class variables
+    event_keys = ['time', 'team', 'event', 'subevent', 'zone', 'player']
+
+    # constructor
+    def __init__(self, filename: str, teams: set, main_team = 'iks') -> None:
+        '''filename is the raw csv that collector_raw writes to, teams are the team abbreviations used in it'''
+        self.filename = filename
+        self.main_team = main_team
+        self.game = Game(teams)
+        # raw row number -> clean row, dicts keep the order the rows were typed in
+        self.rows = dict()
+        # the Stats object of live_stats, kept up to date by apply
+        self.current = None
+        return
+
+# non-static methods
+    def apply(self, change: tuple) -> None:
+        '''applies one ('add', row) or ('del', row) from Game.stream_clean'''
+        action, row = change
+        # a row added after the others is appended to the live stats, anything else makes them again when asked for
+        if action == 'add' and row['raw row'] not in self.rows:
+            if self.current is not None and not self.current.append(row):
+                self.current = None
+        else:
+            self.current = None
+        if action == 'add':
+            self.rows[row['raw row']] = row
+        else:
+            del self.rows[row['raw row']]
+        return
+
+    def follow(self, poll_interval = 0.5, timeout = None):
+        '''tails the raw csv and yields every change once it has been applied, see EventLog.tail and Game.stream_clean'''
+        for change in self.game.stream_clean(EventLog.tail(self.filename, poll_interval, timeout)):
+            self.apply(change)
+            yield change
+        return
+
+    def df(self, closed = False) -> pd.core.frame.DataFrame:
+        '''returns the rows so far in the same format as Game.read_clean_csv
+            if closed and the half is still going, a stop is added at the time of the last row'''
+        rows = list(self.rows.values())
+        if closed and len(rows) > 0 and rows[-1]['event'] != 'stop':
+            rows.append({'time': rows[-1]['time'], 'team': '0', 'event': 'stop', 'subevent': '0', 'zone': '0', 'player': '0'})
+        df = pd.DataFrame(rows, columns=LiveGame.event_keys)
+        # read_csv reads the players as numbers
+        df['player'] = pd.to_numeric(df['player'])
+        return Game.event_frame(df)
+
+    def stats(self, N = 3) -> Stats:
+        '''returns a Stats object of the game so far, Stats expects every half to end with a stop'''
+        return Stats(self.filename, main_team = self.main_team, N = N, big_df = self.df(closed = True))
+
+    def live_stats(self, N = 3) -> Stats:
+        '''returns a Stats object of the game so far that apply keeps up to date, new rows are appended to it (see Stats.append)
+            so asking for it after every row is cheap, only a deleted row or a new team makes it again. unlike stats no stop is added'''
+        if self.current is None or self.current.N != N:
+            self.current = Stats(self.filename, main_team = self.main_team, N = N, big_df = self.df())
+        return self.current
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description='cleans a raw csv while collector_raw is still writing to it and prints every clean row')
+    parser.add_argument('file', help='raw csv file (with or without .csv)')
+    parser.add_argument('--teams', nargs='+', required=True, help='the team abbreviations used in the file, e.g. iks rät')
+    args = parser.parse_args()
+
+    live = LiveGame(args.file, set(args.teams))
+    for action, row in live.follow():
+        print(('   ' if action == 'add' else 'del'), *[row[key] for key in LiveGame.event_keys])
+    print(f'{len(live.rows)} events')
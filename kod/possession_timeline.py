@@ -0,0 +1,111 @@
+import numpy as np
+
+
+class PossessionTimeline:
+    '''who has the ball when during a half, one interval per possession change kept as parallel numpy arrays
+        team is a code into self.teams, -1 when nobody has the ball (a break in play), start and end are seconds.
+        an interval lasts until the next one starts, the last one (usually the stop) has no length.
+        a time out of order in the csv gives an interval that ends before it starts, it counts as negative seconds
+        so that the possession of the half still adds up to its length, like the possession list always has'''
+
+    # constructor
+    def __init__(self, possession_list: list, teams = ()) -> None:
+        '''possession_list is a list of (team, sec) where team has the ball from sec on, like Stats.possession_list
+            the codes of teams follow the given order, teams only found in the list (like '0') come after them'''
+        self.teams = list(teams) + sorted({team for team, sec in possession_list if team is not None} - set(teams))
+        codes = {team: code for code, team in enumerate(self.teams)}
+        self.team = np.array([-1 if team is None else codes[team] for team, sec in possession_list], dtype=np.int8)
+        self.start = np.array([sec for team, sec in possession_list], dtype=np.int32)
+        self.end = np.append(self.start[1:], self.start[-1:])
+        return
+
+# dunder len, the number of intervals
+    def __len__(self) -> int:
+        return len(self.start)
+
+# non-static methods
+    def code(self, team: str) -> int:
+        '''returns the code of team, -1 for None (nobody has the ball)'''
+        return -1 if team is None else self.teams.index(team)
+
+    def name(self, code: int) -> str:
+        '''returns the team of code, None for -1'''
+        return None if code < 0 else self.teams[code]
+
+    def lengths(self) -> np.ndarray:
+        '''returns the length of every interval in seconds'''
+        return self.end - self.start
+
+    def out_of_order(self) -> np.ndarray:
+        '''returns the indices of the intervals that end before they start, where the time of the csv goes back'''
+        return np.flatnonzero(self.lengths() < 0)
+
+    def changes_at(self, t) -> np.ndarray:
+        '''returns True where an interval starts exactly at t (a second or an array of them), that is where the ball changed hands
+            a binary search in the sorted starts, a few halves have times out of order'''
+        t = np.asarray(t)
+        if len(self) == 0:
+            return np.zeros(t.shape, dtype=bool)
+        changes = np.sort(self.start)
+        return changes[np.minimum(np.searchsorted(changes, t), len(changes) - 1)] == t
+
+    def seconds(self, a, b) -> np.ndarray:
+        '''returns the possession seconds of each team (indexed by code) inside [a, b)
+            a and b can be arrays of the same length, then the result has one row per window.
+            an interval out of order takes its seconds away (see the class), so a window can get negative seconds'''
+        a, b = np.asarray(a, dtype=float), np.asarray(b, dtype=float)
+        low, high = np.minimum(self.start, self.end), np.maximum(self.start, self.end)
+        overlap = np.clip(np.minimum(high, b[..., None]) - np.maximum(low, a[..., None]), 0, None) * np.sign(self.lengths())
+        return overlap @ (self.team[:, None] == np.arange(len(self.teams))).astype(float)
+
+    def longer_than(self, length: int, team = None) -> np.ndarray:
+        '''returns the indices of the intervals lasting more than length seconds, only those of team if given'''
+        mask = self.lengths() > length
+        if team is not None:
+            mask &= self.team == self.code(team)
+        return np.flatnonzero(mask)
+
+    def sustained_attacks(self, disruption_length: int) -> tuple:
+        '''returns (index, team, time) arrays with one entry per attack, the interval it starts in, the code of the attacking team and its possession seconds
+            an attack goes on until the other team has the ball longer than disruption_length, or has it when play stops or the half ends.
+            every such interval of the other team starts its next attack, so the attacks are the changes of team in the sequence of those intervals,
+            found in one sweep. the caller keeps the attacks long enough to count'''
+        n = len(self)
+        playing = (self.team == 0) | (self.team == 1)
+        if n < 2 or not playing[:-1].any():
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int8), np.zeros(0, dtype=np.int64)
+        first = int(np.argmax(playing))
+        # intervals where the team having the ball would end an attack of the other team
+        stop_next = np.append(self.team[1:] == -1, True)
+        ending = np.flatnonzero(playing & ((self.lengths() > disruption_length) | stop_next))
+        ending = ending[ending > first]
+        ending_team = self.team[ending]
+        # an attack ends at the first such interval of the other team, which starts the next attack
+        changes = ending[ending_team != np.append(self.team[first], ending_team[:-1])]
+        index = np.append(first, changes[changes < n - 1])
+        stop = np.append(index[1:], n)
+        team = self.team[index]
+        # possession seconds of each team before every interval
+        cumulative = np.zeros((2, n + 1), dtype=np.int64)
+        cumulative[:, 1:] = np.cumsum(np.where(self.team == np.arange(2)[:, None], self.lengths(), 0), axis=1)
+        return index, team, cumulative[team, stop] - cumulative[team, index]
+
+
+if __name__ == '__main__':
+    import argparse
+    import general_functions as gf
+    from get_stats import Stats
+    parser = argparse.ArgumentParser(description='prints the possession per team and the long possessions of a clean csv')
+    parser.add_argument('file', help='the clean csv')
+    parser.add_argument('--length', type=int, default=30, help='possessions longer than this many seconds are listed')
+    parser.add_argument('--grid', action='store_true', help='prints the sustained attacks for a grid of min lengths and disruption lengths')
+    args = parser.parse_args()
+
+    stats = Stats(args.file)
+    timeline = stats.get_possession_timeline()
+    for team, sec in zip(timeline.teams, timeline.seconds(timeline.start[0], timeline.end[-1])):
+        print(f'{team}: {gf.sec_to_readable(int(sec))}')
+    for i in timeline.longer_than(args.length):
+        print(f'{gf.sec_to_readable(int(timeline.start[i]))} {timeline.name(timeline.team[i])} {timeline.lengths()[i]} s')
+    if args.grid:
+        print(stats.get_sustained_attacks_grid().pivot(index=['team', 'min length'], columns='disruption length', values='attacks'))
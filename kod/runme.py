@@ -14,14 +14,14 @@ import timedelta
 gf.clean_up()
 
 os.chdir(r'C:/Users/viking.nilsson/VSCode/Python/sirius_bandy/data/compile/2024/vetlanda hemma')
-v1 = Stats('Vetlanda hemma halvlek 1 första 15') 
-v2 = Stats('Vetlanda hemma halvlek 2 första 15') 
-v3 = Stats('Vetlanda hemma halvlek 1 15-30') 
-v4 = Stats('Vetlanda hemma halvlek 2 15-30') 
-v5 = Stats('Vetlanda hemma halvlek 1 30-45') 
-v6 = Stats('Vetlanda hemma halvlek 2 30-45') 
-v7 = Stats('Vetlanda hemma halvlek 1 15-45') 
-v8 = Stats('Vetlanda hemma halvlek 2 15-45') 
+v1 = Stats.load('Vetlanda hemma halvlek 1 första 15') 
+v2 = Stats.load('Vetlanda hemma halvlek 2 första 15') 
+v3 = Stats.load('Vetlanda hemma halvlek 1 15-30') 
+v4 = Stats.load('Vetlanda hemma halvlek 2 15-30') 
+v5 = Stats.load('Vetlanda hemma halvlek 1 30-45') 
+v6 = Stats.load('Vetlanda hemma halvlek 2 30-45') 
+v7 = Stats.load('Vetlanda hemma halvlek 1 15-45') 
+v8 = Stats.load('Vetlanda hemma halvlek 2 15-45') 
 
 os.chdir(r'C:/Users/viking.nilsson/VSCode/Python/sirius_bandy/powerpointer/matchrapporter')
 pp = PP(v1)
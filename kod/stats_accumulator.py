@@ -0,0 +1,277 @@
+import numpy as np
+import pandas as pd
+import json
+import os
+from count_cube import CountCube
+
+
+class StatsAccumulator:
+    '''the prints of one or more halves as numpy arrays that can be merged, what adding Stats objects is built on
+        every section is flattened to one array with a row per path through its nested dicts, and is merged the way merge_types says:
+        sum adds the values, concat appends the lists of each half in order and offset also raises each list by where the previous one ended.
+        merge takes any number of accumulators at once, so all the halves of a season are one numpy sum per section.
+        the counting sections (Stats.cube_sections) are not kept, the count cubes are summed instead and fill reads them from the summed cube.
+        the player table (Stats.get_player_table) is summed too, but only made when it is asked for (see player_table), halves without a player column have none.
+        merging is associative, partial merges (e.g. made in worker processes) can be merged again.
+        save and load keep an accumulator in an npz file, the arrays as they are and the rest as json, so nothing is pickled'''
+
+    # class variables
+    # section -> how it is merged, the sections not listed are summed
+    merge_types = {'per time lists': 'concat', '40': 'concat', 'sustained attacks': 'concat',
+                   'expected goals list': 'offset', 'goals lists': 'offset'}
+    # lists of the Stats object that are appended
+    list_attributes = ['possession_list', 'goal_origins_list', 'goals_info_list']
+    # stands for the position in a list of dicts in a path, like the parts in the per time lists
+    list_key = '[]'
+    # ends the path of an empty dict, so that it is kept
+    empty_key = '{}'
+    # the layout of the files of save, a file of another layout is not loaded
+    file_version = 2
+
+    # constructor
+    def __init__(self, stats = None) -> None:
+        '''the accumulator of a Stats object (all its sections are computed), empty if stats is None'''
+        # section -> (paths, values, integer), values has one row per path, and for concat and offset one column per list entry
+        # integer tells which rows were ints, a section with both ints and floats is stored as floats
+        self.sections = dict()
+        self.lists = {name: list() for name in StatsAccumulator.list_attributes}
+        self.cube = CountCube()
+        # the player table, None if it is not made yet or no half had a player column
+        self.players = None
+        # the player tables and the Stats objects whose tables are not made yet, in order, see player_table
+        self.sources = list()
+        self.names = list()
+        self.number_of_games = 0
+        self.teams = None
+        self.main_team = None
+        if stats is not None:
+            stats.compile_stats()
+            for section in stats.prints:
+                if section in stats.cube_sections:
+                    continue
+                leaves = StatsAccumulator.flatten(stats.prints[section])
+                self.sections[section] = ([path for path, leaf in leaves], np.array([leaf for path, leaf in leaves]),
+                                          np.array([all(isinstance(x, (int, np.integer)) for x in np.ravel(leaf)) for path, leaf in leaves], dtype=bool))
+            self.lists = {name: list(getattr(stats, name)) for name in StatsAccumulator.list_attributes}
+            self.cube = stats.count_cube
+            if stats.has_players():
+                self.sources = [stats]
+            self.names = [stats.out]
+            self.number_of_games = stats.number_of_games
+            self.teams = stats.teams
+            self.main_team = stats.main_team
+        return
+
+# static methods
+    def flatten(value, path = ()) -> list:
+        '''returns (path, leaf) for every number or list of numbers in the nested dicts of value
+            a list of dicts, like [{team: n}], becomes one list per key with list_key in its path'''
+        if isinstance(value, dict):
+            if len(value) == 0:
+                return [(path + (StatsAccumulator.empty_key,), 0)]
+            return [leaf for key in value for leaf in StatsAccumulator.flatten(value[key], path + (key,))]
+        if isinstance(value, list) and len(value) > 0 and isinstance(value[0], dict):
+            keys = list(dict.fromkeys(key for d in value for key in d))
+            return [(path + (StatsAccumulator.list_key, key), [d.get(key, 0) for d in value]) for key in keys]
+        return [(path, value)]
+
+    def unflatten(paths: list, values: np.ndarray, integer: np.ndarray) -> object:
+        '''returns the nested dicts that flatten made paths and values from'''
+        root = dict()
+        for path, value, is_integer in zip(paths, values.tolist(), integer.tolist()):
+            if is_integer:
+                value = [int(x) for x in value] if isinstance(value, list) else int(value)
+            if len(path) == 0:
+                return value
+            if StatsAccumulator.list_key in path:
+                i = path.index(StatsAccumulator.list_key)
+                path, key = path[:i], path[i + 1]
+                node = root
+                for k in path[:-1]:
+                    node = node.setdefault(k, dict())
+                for d, x in zip(node.setdefault(path[-1], [dict() for x in value]), value):
+                    d[key] = x
+                continue
+            node = root
+            for k in path[:-1]:
+                node = node.setdefault(k, dict())
+            if path[-1] != StatsAccumulator.empty_key:
+                node[path[-1]] = value
+        return root
+
+    def merge_section(merge_type: str, parts: list) -> tuple:
+        '''returns (paths, values, integer) of the parts (paths, values, integer) of one section merged, a path missing in a part counts as 0'''
+        paths = list(dict.fromkeys(path for part in parts for path in part[0]))
+        index = {path: i for i, path in enumerate(paths)}
+        rows = [[index[path] for path in part[0]] for part in parts]
+        dtype = np.result_type(*[part[1] for part in parts if len(part[0]) > 0]) if any(len(part[0]) > 0 for part in parts) else int
+        integer = np.ones(len(paths), dtype=bool)
+        for row, part in zip(rows, parts):
+            integer[row] &= part[2]
+        if merge_type == 'sum':
+            matrix = np.zeros((len(parts), len(paths)), dtype=dtype)
+            for i, (row, part) in enumerate(zip(rows, parts)):
+                matrix[i, row] = part[1]
+            return paths, matrix.sum(axis=0), integer
+        blocks = list()
+        for row, part in zip(rows, parts):
+            block = np.zeros((len(paths), part[1].shape[1] if part[1].ndim == 2 else 0), dtype=dtype)
+            block[row] = part[1]
+            blocks.append(block)
+        if merge_type == 'offset':
+            # each list starts where the lists before it ended
+            lasts = np.array([block[:, -1] if block.shape[1] > 0 else np.zeros(len(paths), dtype=dtype) for block in blocks])
+            offsets = np.concatenate([np.zeros((1, len(paths)), dtype=dtype), np.cumsum(lasts, axis=0)[:-1]])
+            blocks = [block + offset[:, None] for block, offset in zip(blocks, offsets)]
+        return paths, np.concatenate(blocks, axis=1), integer
+
+    def count_columns(table: pd.core.frame.DataFrame) -> pd.core.frame.DataFrame:
+        '''returns the player table with every column but xg as ints, summing or saving it makes them floats'''
+        return table.astype({column: float if column == ('xg', '') else np.int64 for column in table.columns})
+
+    def merge_players(tables: list) -> pd.core.frame.DataFrame:
+        '''returns the player tables summed, a player or column missing in a table counts as 0, None if there are no tables'''
+        if len(tables) == 0:
+            return None
+        if len(tables) == 1:
+            return tables[0]
+        # sort=False, a few halves have players that are not numbers
+        table = pd.concat(tables).fillna(0).groupby(level=0, sort=False).sum()
+        return StatsAccumulator.count_columns(table.sort_index(axis=1))
+
+    def merge(accumulators: list):
+        '''returns one accumulator of all accumulators, in order'''
+        merged = StatsAccumulator()
+        accumulators = [accumulator for accumulator in accumulators if accumulator.number_of_games > 0]
+        if len(accumulators) == 0:
+            return merged
+        for section in dict.fromkeys(section for accumulator in accumulators for section in accumulator.sections):
+            parts = [accumulator.sections[section] for accumulator in accumulators if section in accumulator.sections]
+            merged.sections[section] = StatsAccumulator.merge_section(StatsAccumulator.merge_types.get(section, 'sum'), parts)
+        merged.lists = {name: [x for accumulator in accumulators for x in accumulator.lists[name]] for name in StatsAccumulator.list_attributes}
+        merged.cube = CountCube.merge([accumulator.cube for accumulator in accumulators])
+        merged.sources = [source for accumulator in accumulators for source in ([] if accumulator.players is None else [accumulator.players]) + accumulator.sources]
+        merged.names = [name for accumulator in accumulators for name in accumulator.names]
+        merged.number_of_games = sum(accumulator.number_of_games for accumulator in accumulators)
+        merged.teams = accumulators[0].teams
+        merged.main_team = accumulators[0].main_team
+        return merged
+
+    def load(filename: str) -> tuple:
+        '''returns (accumulator, header) from a file made by save, or (None, None) if there is none or it can't be read'''
+        if not os.path.isfile(filename):
+            return None, None
+        try:
+            with np.load(filename, allow_pickle=False) as data:
+                meta = json.loads(data['meta'].tobytes().decode('utf-8'))
+                if meta['file version'] != StatsAccumulator.file_version:
+                    return None, None
+                accumulator = StatsAccumulator()
+                integer = data['integer']
+                for section in meta['sections']:
+                    values = data[section['values']]
+                    accumulator.sections[section['name']] = ([tuple(path) for path in section['paths']],
+                                                             values[section['start']:section['start'] + int(np.prod(section['shape']))].reshape(section['shape']),
+                                                             integer[section['row']:section['row'] + len(section['paths'])])
+                accumulator.lists = meta['lists']
+                accumulator.lists['possession_list'] = [tuple(x) for x in accumulator.lists['possession_list']]
+                accumulator.cube.labels = meta['cube labels']
+                accumulator.cube.cells, accumulator.cube.counts = data['cube cells'], data['cube counts']
+                if meta['players'] is not None:
+                    columns = pd.MultiIndex.from_tuples([tuple(column) for column in meta['players']['columns']], names=['metric', 'subevent'])
+                    accumulator.players = StatsAccumulator.count_columns(pd.DataFrame(data['player values'], index=pd.Index(meta['players']['index'], name='player'),
+                                                                                      columns=columns))
+                accumulator.names = meta['names']
+                accumulator.number_of_games = meta['number of games']
+                accumulator.teams = set(meta['teams'])
+                accumulator.main_team = meta['main team']
+        except Exception as e:
+            print(f'ignoring broken stats file {filename}: {e}')
+            return None, None
+        return accumulator, meta['header']
+
+# dunder getstate, the Stats objects of the halves are not sent to another process with the accumulator
+    def __getstate__(self) -> dict:
+        state = dict(self.__dict__)
+        state['sources'] = [source for source in self.sources if isinstance(source, pd.DataFrame)]
+        return state
+
+# non-static methods
+    def has_players(self) -> bool:
+        '''returns True if some half had a player column, without making the table'''
+        return self.players is not None or len(self.sources) > 0
+
+    def player_table(self) -> pd.core.frame.DataFrame:
+        '''returns the player table of the halves, None if no half had a player column
+            the tables of the halves are made and summed the first time, so adding halves costs nothing for it until a player report asks for it'''
+        if len(self.sources) > 0:
+            tables = ([] if self.players is None else [self.players]) + [source if isinstance(source, pd.DataFrame) else source.get_player_table() for source in self.sources]
+            self.players = StatsAccumulator.merge_players(tables)
+            self.sources = list()
+        return self.players
+
+    def release(self, players = False) -> None:
+        '''lets go of the Stats objects of the halves, their player tables are made and summed first if players'''
+        if players:
+            self.player_table()
+        self.sources = [source for source in self.sources if isinstance(source, pd.DataFrame)]
+        return
+
+    def save(self, filename: str, header = None) -> bool:
+        '''saves the accumulator and header (a dict for the one loading it, like versions) to filename, returns False if it could not be saved
+            written to a temporary file first so that a crash never leaves half a file'''
+        # all sections share one array of ints, one of floats and one of the integer flags, few arrays load faster
+        self.player_table()
+        sections = list()
+        flat = {'ints': list(), 'floats': list()}
+        size = {'ints': 0, 'floats': 0}
+        row = 0
+        for section, (paths, values, integer) in self.sections.items():
+            if values.dtype.kind not in 'iubf':
+                print(f'unable to save {filename}: {section} is not numeric')
+                return False
+            kind = 'floats' if values.dtype.kind == 'f' else 'ints'
+            sections.append({'name': section, 'paths': paths, 'values': kind, 'start': size[kind], 'shape': list(values.shape), 'row': row})
+            flat[kind].append(values.ravel())
+            size[kind] += values.size
+            row += len(paths)
+        arrays = {'ints': np.concatenate(flat['ints'] + [np.zeros(0, dtype=np.int64)]).astype(np.int64),
+                  'floats': np.concatenate(flat['floats'] + [np.zeros(0)]).astype(float),
+                  'integer': np.concatenate([integer for paths, values, integer in self.sections.values()] + [np.zeros(0, dtype=bool)]),
+                  'cube cells': self.cube.cells, 'cube counts': self.cube.counts,
+                  'player values': np.zeros((0, 0)) if self.players is None else self.players.to_numpy(dtype=float)}
+        players = None if self.players is None else {'index': self.players.index.tolist(), 'columns': [list(column) for column in self.players.columns]}
+        meta = {'file version': StatsAccumulator.file_version, 'header': header, 'sections': sections, 'lists': self.lists,
+                'cube labels': self.cube.labels, 'players': players, 'names': self.names, 'number of games': self.number_of_games,
+                'teams': sorted(self.teams) if self.teams is not None else list(), 'main team': self.main_team}
+        try:
+            # numpy numbers in the lists are written as python numbers
+            arrays['meta'] = np.frombuffer(json.dumps(meta, default=lambda x: x.item() if isinstance(x, np.generic) else str(x)).encode('utf-8'), dtype=np.uint8)
+            os.makedirs(os.path.dirname(os.path.abspath(filename)), exist_ok=True)
+            with open(filename + '.tmp', 'wb') as f:
+                np.savez(f, **arrays)
+            os.replace(filename + '.tmp', filename)
+        except (OSError, TypeError, ValueError) as e:
+            print(f'unable to save {filename}: {e}')
+            return False
+        return True
+
+    def prints(self) -> dict:
+        '''returns the sections as the nested dicts of Stats.prints'''
+        return {section: StatsAccumulator.unflatten(*self.sections[section]) for section in self.sections}
+
+    def fill(self, stats):
+        '''fills stats (a dummy Stats object) with the merged halves and returns it'''
+        for section, value in self.prints().items():
+            stats.prints[section] = value
+        for name in StatsAccumulator.list_attributes:
+            setattr(stats, name, self.lists[name])
+        stats.count_cube = self.cube
+        if self.has_players():
+            stats.accumulator = self
+        for section in stats.cube_sections:
+            stats.prints[section]
+        stats.out = ' och '.join(self.names)
+        stats.number_of_games = self.number_of_games
+        stats.teams = self.teams
+        return stats
@@ -0,0 +1,142 @@
+import numpy as np
+import pandas as pd
+from bisect import bisect_left, bisect_right
+
+
+class TimeBuckets:
+    '''the number of events per time bucket, team and event, as one (bucket x team x event) tensor made in one pass with np.digitize and np.bincount
+        a bucket is either one of N equal parts of the half, (a, b] like the per time lists have always been counted,
+        or width seconds long, [a, b) like the game minutes. with weights the tensor holds sums instead of counts.
+        events appended at the end of the half are counted with add, without counting the half again'''
+
+    # constructor
+    def __init__(self, sec, team, event, teams: list, N = None, width = None, end = None, weights = None) -> None:
+        '''sec, team and event are the columns of the events (e.g. of big_df), teams the teams that get a row in the tensor
+            give either N or width, end is the last second of the half (the time of the last event if None)
+            events of other teams, without an event or outside the half are not counted'''
+        sec = np.asarray(sec)
+        end = (sec[-1] if len(sec) > 0 else 0) if end is None else end
+        self.teams = list(teams)
+        self.N = N
+        self.width = width
+        team_codes = pd.Categorical(team, categories=self.teams).codes
+        event = pd.Categorical(event)
+        self.events = event.categories.tolist()
+        self.edges = self.make_edges(end)
+        if N is not None:
+            bucket = np.digitize(sec, self.edges, right=True) - 1
+        else:
+            bucket = sec // width
+        n_buckets = len(self.edges) - 1
+        counted = (bucket >= 0) & (bucket < n_buckets) & (team_codes >= 0) & (event.codes >= 0)
+        index = (bucket[counted] * len(self.teams) + team_codes[counted]) * len(self.events) + event.codes[counted]
+        self.counts = np.bincount(index, weights=None if weights is None else np.asarray(weights)[counted],
+                                  minlength=n_buckets * len(self.teams) * len(self.events)).reshape(n_buckets, len(self.teams), len(self.events))
+        if weights is None or np.issubdtype(np.asarray(weights).dtype, np.integer):
+            self.counts = self.counts.astype(np.int64)
+        # the seconds of the events of teams, sorted, and their (team, event) codes, for add. an event outside the half can come inside it later
+        self.secs, self.cells = list(), list()
+        if weights is None:
+            kept = (team_codes >= 0) & (event.codes >= 0)
+            order = np.argsort(sec[kept], kind='stable')
+            self.secs = sec[kept][order].tolist()
+            self.cells = list(zip(team_codes[kept][order].tolist(), event.codes[kept][order].tolist()))
+        return
+
+# dunder len, the number of buckets
+    def __len__(self) -> int:
+        return len(self.counts)
+
+# non-static methods
+    def make_edges(self, end) -> np.ndarray:
+        '''returns the edges of the buckets of a half that ends at end'''
+        if self.N is not None:
+            return end / self.N * np.arange(self.N + 1)
+        return self.width * np.arange(end // self.width + 2)
+
+    def bucket(self, sec, edges: np.ndarray) -> int:
+        '''returns the bucket of sec between edges, -1 if it is outside the half'''
+        if self.N is not None:
+            # (a, b], like np.digitize with right=True
+            bucket = bisect_left(edges, sec) - 1
+        else:
+            bucket = int(sec // self.width)
+        return bucket if 0 <= bucket < len(edges) - 1 else -1
+
+    def add(self, sec, team, event, end = None) -> None:
+        '''counts one more event, appended at the end of the half so that the half now ends at end (sec if None)
+            the event is counted in its bucket. with N parts the edges move with the end of the half, and only the events between
+            an old and a new edge change bucket, they are found with a binary search in the sorted seconds. with width only the last bucket can come or go.
+            only for counts, buckets with weights are made again'''
+        end = sec if end is None else end
+        edges = self.make_edges(end)
+        if self.N is not None and min(end, self.edges[-1]) < 0:
+            # the edges of a half that ends before 0 (an unreadable time) go backwards, those are counted again
+            self.insert(sec, team, event)
+            self.recount(edges)
+            return
+        # the stretches between the old and the new edges, where events change bucket
+        if self.N is not None:
+            stretches = zip(self.edges.tolist(), edges.tolist())
+        else:
+            stretches = [(self.edges[-1], edges[-1])]
+        moved = [(i, self.bucket(self.secs[i], self.edges), self.bucket(self.secs[i], edges))
+                 for a, b in stretches if a != b for i in range(bisect_left(self.secs, min(a, b)), bisect_right(self.secs, max(a, b)))]
+        for i, old, new in moved:
+            if old >= 0 and old != new:
+                self.counts[(old,) + self.cells[i]] -= 1
+        if len(edges) != len(self.edges):
+            # width buckets, the last one comes or goes as the end passes its edge
+            counts = np.zeros((len(edges) - 1,) + self.counts.shape[1:], dtype=self.counts.dtype)
+            n = min(len(counts), len(self.counts))
+            counts[:n] = self.counts[:n]
+            self.counts = counts
+        self.edges = edges
+        for i, old, new in moved:
+            if new >= 0 and old != new:
+                self.counts[(new,) + self.cells[i]] += 1
+        cell = self.insert(sec, team, event)
+        bucket = self.bucket(sec, self.edges)
+        if cell is not None and bucket >= 0:
+            self.counts[(bucket,) + cell] += 1
+        return
+
+    def insert(self, sec, team, event) -> tuple:
+        '''keeps the seconds and (team, event) codes of one more event in order, returns its codes or None if it is not counted
+            an event nobody had yet gets a column of zeros'''
+        if team not in self.teams or event is None or event != event:
+            return None
+        if event not in self.events:
+            self.events.append(event)
+            self.counts = np.concatenate([self.counts, np.zeros(self.counts.shape[:2] + (1,), dtype=self.counts.dtype)], axis=2)
+        cell = (self.teams.index(team), self.events.index(event))
+        i = bisect_right(self.secs, sec)
+        self.secs.insert(i, sec)
+        self.cells.insert(i, cell)
+        return cell
+
+    def recount(self, edges: np.ndarray) -> None:
+        '''counts the kept events again between edges, like the constructor does'''
+        self.edges = edges
+        sec = np.asarray(self.secs)
+        cells = np.asarray(self.cells, dtype=np.int64).reshape(-1, 2)
+        bucket = np.digitize(sec, edges, right=True) - 1 if self.N is not None else (sec // self.width).astype(np.int64)
+        counted = (bucket >= 0) & (bucket < len(edges) - 1)
+        index = (bucket[counted] * len(self.teams) + cells[counted, 0]) * len(self.events) + cells[counted, 1]
+        self.counts = np.bincount(index, minlength=(len(edges) - 1) * len(self.teams) * len(self.events)).reshape(len(edges) - 1, len(self.teams), len(self.events)).astype(np.int64)
+        return
+
+    def select(self, events = None) -> np.ndarray:
+        '''returns the (bucket x team) counts of events summed, all events if None'''
+        if events is None:
+            return self.counts.sum(axis=2)
+        codes = [self.events.index(event) for event in events if event in self.events]
+        return self.counts[:, :, codes].sum(axis=2)
+
+    def per_bucket(self, events = None) -> list:
+        '''returns [{team: count}] with one dict per bucket, the format of prints['per time lists']'''
+        return [dict(zip(self.teams, row)) for row in self.select(events).tolist()]
+
+    def per_team(self, events = None) -> dict:
+        '''returns {team: [count per bucket]}, the format of the minute lists'''
+        return dict(zip(self.teams, self.select(events).T.tolist()))